@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,48 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture
+def query_budget(settings):
+    """Запрос страницы с проверкой числа обращений к базе.
+
+    Падает, если view сделала больше запросов, чем указано для неё
+    в settings.QUERY_BUDGETS, или повторила одну форму запроса
+    NPLUSONE_THRESHOLD раз (N+1).
+    """
+    from django.core.cache import cache
+
+    from core.nplusone import QueryTracker, budget_key
+
+    def get(client, url, **kwargs):
+        # страницы из кэша не ходят в базу и ничего не проверяют
+        cache.clear()
+        with QueryTracker() as tracker:
+            response = client.get(url, **kwargs)
+        view = budget_key(response.resolver_match)
+        budget = settings.QUERY_BUDGETS.get(
+            view, settings.DEFAULT_QUERY_BUDGET
+        )
+        assert not tracker.problems(), (
+            f'Страница `{url}` ({view}) повторяет запросы:\n'
+            f'{tracker.report()}'
+        )
+        assert tracker.count <= budget, (
+            f'Страница `{url}` ({view}) делает {tracker.count} запросов '
+            f'к базе, допустимо не больше {budget}'
+        )
+        return response
+    return get
+
+
+@pytest.fixture(autouse=True)
+def thumbnail_workers(mock_media):
+    """Дожидается фоновых потоков миниатюр до удаления временного
+    MEDIA_ROOT: иначе поток пишет в каталог, который удаляет тест."""
+    from posts import thumbnails
+
+    yield
+    if thumbnails._executor is not None:
+        thumbnails._executor.shutdown(wait=True)
+        thumbnails._executor = None
@@ -0,0 +1,28 @@
+import pytest
+from mixer.backend.django import mixer
+
+from posts.models import Comment, Follow, Post
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_within_budget(self, user_client, user, another_user,
+                                 group, query_budget):
+        posts = mixer.cycle(15).blend(
+            Post, author=another_user, group=group, image=None
+        )
+        for number in range(8):
+            Comment.objects.create(
+                post=posts[-1], text=f'Комментарий {number}',
+                author=user if number % 2 else another_user,
+            )
+        Follow.objects.create(user=user, author=another_user)
+        for url in (
+            '/', f'/group/{group.slug}/', f'/profile/{another_user.username}/',
+            f'/posts/{posts[-1].pk}/', '/follow/', '/search/?q=a',
+        ):
+            response = query_budget(user_client, url)
+            assert response.status_code == 200, (
+                f'Страница `{url}` работает неправильно'
+            )
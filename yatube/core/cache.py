@@ -0,0 +1,200 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import perf
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+    'expires REAL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+# время последнего чтения обновляется не чаще раза в секунду
+ACCESS_RESOLUTION = 1.0
+# COUNT(*) - полный проход по таблице, поэтому размер проверяется раз
+# в столько тысячных MAX_ENTRIES записей, а не при каждой
+CULL_CHECK_FRACTION = 1000
+
+
+@contextmanager
+def immediate_transaction(connection):
+    # блокировка на запись берётся сразу, а не при первом UPDATE
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+class SQLiteCache(BaseCache):
+    '''Кэш в отдельном файле SQLite, общий для всех процессов сервера.
+
+    При переполнении вытесняются давно не читанные записи (LRU),
+    целые числа хранятся как есть, поэтому incr атомарен.
+    '''
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._cull_every = max(1, self._max_entries // CULL_CHECK_FRACTION)
+        self._writes = 0
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=10, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _touch_rows(self, keys, now):
+        self._connection().executemany(
+            'UPDATE cache SET accessed = ? WHERE key = ?',
+            [(now, key) for key in keys],
+        )
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        names = {self._key(key, version): key for key in keys}
+        now = time.time()
+        rows = self._connection().execute(
+            'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({", ".join("?" * len(names))})',
+            list(names),
+        ).fetchall()
+        result, stale = {}, []
+        for name, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            if now - accessed > ACCESS_RESOLUTION:
+                stale.append(name)
+            result[names[name]] = self._decode(value)
+        if stale:
+            self._touch_rows(stale, now)
+        perf.record_cache(len(result), len(names) - len(result))
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+            (key, self._encode(value), self.get_backend_timeout(timeout),
+             time.time()),
+        )
+        self._cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        connection = self._connection()
+        with immediate_transaction(connection):
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now),
+            )
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                (key, self._encode(value), self.get_backend_timeout(timeout),
+                 now),
+            ).rowcount == 1
+        if added:
+            self._cull()
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        name = self._key(key, version)
+        connection = self._connection()
+        with immediate_transaction(connection):
+            updated = connection.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ? '
+                "AND typeof(value) = 'integer' "
+                'AND (expires IS NULL OR expires > ?)',
+                (delta, name, time.time()),
+            ).rowcount
+            if updated:
+                return connection.execute(
+                    'SELECT value FROM cache WHERE key = ?', (name,)
+                ).fetchone()[0]
+        # не целое значение: обычное поведение BaseCache
+        return super().incr(key, delta, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        ).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def _cull(self):
+        # кэш может ненадолго превысить MAX_ENTRIES на _cull_every записей
+        self._writes += 1
+        if self._writes % self._cull_every:
+            return
+        connection = self._connection()
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        if self._cull_frequency == 0:
+            return self.clear()
+        connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
@@ -0,0 +1,18 @@
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.templates, deploy=True)
+def check_templates_compile(app_configs, **kwargs):
+    '''Выкладка останавливается, если какой-то шаблон не компилируется.'''
+    from .templates import compile_all
+
+    _, errors = compile_all()
+    return [
+        Error(
+            f'Шаблон {name} не компилируется: {error}',
+            hint='Исправьте шаблон до выкладки',
+            obj=name,
+            id='core.E001',
+        )
+        for name, error in errors.items()
+    ]
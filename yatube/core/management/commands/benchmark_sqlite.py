@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.signals import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author INTEGER, '
+    'text TEXT, pub_date REAL)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+)
+FEED_SQL = 'SELECT id, author, text FROM post ORDER BY pub_date DESC LIMIT 10'
+
+
+def _connect(path, pragmas):
+    connection = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(connection, pragmas)
+    return connection
+
+
+def _worker(path, pragmas, persistent, role, deadline, results):
+    '''Запросы как у процесса сервера: без постоянного соединения
+    каждый запрос открывает новое, как при CONN_MAX_AGE = 0.'''
+    connection = _connect(path, pragmas) if persistent else None
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        current = connection or _connect(path, pragmas)
+        try:
+            if role == 'write':
+                current.execute('BEGIN IMMEDIATE')
+                current.execute(
+                    'INSERT INTO post (author, text, pub_date) '
+                    'VALUES (?, ?, ?)', (os.getpid(), 'x' * 200, time.time())
+                )
+                current.execute('COMMIT')
+            else:
+                current.execute(FEED_SQL).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+            if current.in_transaction:
+                current.execute('ROLLBACK')
+        else:
+            latencies.append(time.perf_counter() - started)
+        if connection is None:
+            current.close()
+    results.put((role, latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запись и чтение из нескольких процессов в SQLite '
+        'без настроек и с SQLITE_PRAGMAS и постоянными соединениями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=100000)
+
+    def _run(self, pragmas, persistent, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            connection = _connect(path, pragmas)
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT INTO post (author, text, pub_date) VALUES (?, ?, ?)',
+                ((i % 100, 'x' * 200, i) for i in range(options['rows'])),
+            )
+            connection.execute('COMMIT')
+            connection.close()
+            results = multiprocessing.Queue()
+            deadline = time.time() + options['seconds']
+            roles = (
+                ['write'] * options['writers'] + ['read'] * options['readers']
+            )
+            processes = [
+                multiprocessing.Process(target=_worker, args=(
+                    path, pragmas, persistent, role, deadline, results
+                ))
+                for role in roles
+            ]
+            for process in processes:
+                process.start()
+            collected = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+        writes = [item for item in collected if item[0] == 'write']
+        reads = sum((item[1] for item in collected if item[0] == 'read'), [])
+        p99 = (
+            statistics.quantiles(reads, n=100)[98] * 1000
+            if len(reads) > 1 else 0
+        )
+        return (
+            sum(len(item[1]) for item in writes) / options['seconds'],
+            p99,
+            sum(item[2] for item in collected),
+        )
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('до', {}, False),
+            ('после', settings.SQLITE_PRAGMAS, True),
+        )
+        for name, pragmas, persistent in profiles:
+            throughput, p99, errors = self._run(pragmas, persistent, options)
+            self.stdout.write(
+                f'{name}: запись {throughput:.0f} в секунду, '
+                f'p99 чтения {p99:.2f} мс, ошибок блокировки {errors}'
+            )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.templates import compile_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны и выводит время разбора и компиляции '
+        'каждого, самые медленные первыми'
+    )
+
+    def handle(self, *args, **options):
+        timings, errors = compile_all()
+        for name, parse, compiled in sorted(
+            timings, key=lambda row: row[2], reverse=True
+        ):
+            self.stdout.write(
+                f'{name:40} разбор {parse * 1000:7.2f} мс '
+                f'компиляция {compiled * 1000:7.2f} мс'
+            )
+        self.stdout.write(
+            f'Всего {len(timings)}: разбор '
+            f'{sum(row[1] for row in timings) * 1000:.1f} мс, компиляция '
+            f'{sum(row[2] for row in timings) * 1000:.1f} мс'
+        )
+        if errors:
+            raise CommandError('\n'.join(
+                f'{name}: {error}' for name, error in errors.items()
+            ))
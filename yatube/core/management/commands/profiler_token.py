@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.profiler import make_token
+
+
+class Command(BaseCommand):
+    help = (
+        'Выдаёт ключ профилировщика: добавьте ?profile=<ключ> к адресу '
+        'или передайте заголовок X-Profile, войдя как сотрудник'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
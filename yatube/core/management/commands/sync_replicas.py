@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.routers import PRIMARY, mark_synced
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик и запоминает время '
+        'копии: реплики старше DATABASE_REPLICA_LAG не читаются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять копирование через столько секунд; должно быть '
+                 'меньше DATABASE_REPLICA_LAG',
+        )
+
+    def sync(self):
+        source = sqlite3.connect(settings.DATABASES[PRIMARY]['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                connections[alias].close()
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                # снимок содержит всё, что зафиксировано до начала копии
+                started = time.time()
+                try:
+                    # backup даёт согласованный снимок даже во время записи
+                    source.backup(target)
+                finally:
+                    target.close()
+                mark_synced(alias, started)
+                self.stdout.write(f'{alias}: скопирована')
+        finally:
+            source.close()
+
+    def handle(self, *args, **options):
+        self.sync()
+        while options['interval'] > 0:
+            time.sleep(options['interval'])
+            self.sync()
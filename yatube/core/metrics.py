@@ -0,0 +1,180 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+HEADER = struct.Struct('Q')
+KEY_LENGTH = struct.Struct('I')
+VALUE = struct.Struct('d')
+INITIAL_SIZE = 64 * 1024
+# верхние границы корзин гистограммы времени ответа, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Обработанные запросы по view, методу и статусу'
+    ),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа по view'
+    ),
+}
+
+
+def _read_entries(data):
+    '''(ключ, значение, смещение значения) из содержимого файла.'''
+    used = HEADER.unpack_from(data, 0)[0]
+    offset = HEADER.size
+    while offset < used:
+        length = KEY_LENGTH.unpack_from(data, offset)[0]
+        key = bytes(data[offset + 4:offset + 4 + length]).decode()
+        # значение выровнено по 8 байт
+        value_offset = (offset + 4 + length + 7) & ~7
+        yield key, VALUE.unpack_from(data, value_offset)[0], value_offset
+        offset = value_offset + VALUE.size
+
+
+class ValueFile:
+    '''Значения метрик одного процесса в файле, отображённом в память.
+
+    Пишет в файл только процесс-владелец, поэтому межпроцессных
+    блокировок нет; /metrics складывает файлы всех процессов. Новая
+    запись сначала заполняется, а потом сдвигается длина в заголовке,
+    так что читатель не видит недописанных ключей.
+    '''
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < INITIAL_SIZE:
+            self._file.truncate(INITIAL_SIZE)
+            size = INITIAL_SIZE
+        self._map = mmap.mmap(self._file.fileno(), size)
+        if HEADER.unpack_from(self._map, 0)[0] == 0:
+            HEADER.pack_into(self._map, 0, HEADER.size)
+        self._offsets = {
+            key: offset for key, _, offset in _read_entries(self._map)
+        }
+        self._lock = threading.Lock()
+
+    def _append(self, key):
+        encoded = key.encode()
+        used = HEADER.unpack_from(self._map, 0)[0]
+        value_offset = (used + KEY_LENGTH.size + len(encoded) + 7) & ~7
+        end = value_offset + VALUE.size
+        if end > len(self._map):
+            size = max(len(self._map) * 2, end)
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        KEY_LENGTH.pack_into(self._map, used, len(encoded))
+        self._map[used + 4:used + 4 + len(encoded)] = encoded
+        VALUE.pack_into(self._map, value_offset, 0.0)
+        HEADER.pack_into(self._map, 0, end)
+        self._offsets[key] = value_offset
+        return value_offset
+
+    def add(self, key, amount=1.0):
+        with self._lock:
+            offset = self._offsets.get(key) or self._append(key)
+            value = VALUE.unpack_from(self._map, offset)[0]
+            VALUE.pack_into(self._map, offset, value + amount)
+
+
+_values = None
+_values_lock = threading.Lock()
+
+
+def _process_values():
+    global _values
+    # после fork у процесса gunicorn свой файл
+    owner = os.getpid(), settings.METRICS_DIR
+    if _values is None or _values[0] != owner:
+        with _values_lock:
+            if _values is None or _values[0] != owner:
+                os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                path = os.path.join(settings.METRICS_DIR, f'{owner[0]}.db')
+                _values = owner, ValueFile(path)
+    return _values[1]
+
+
+def _key(name, **labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+def observe_request(view, method, status, seconds):
+    values = _process_values()
+    values.add(_key(
+        'yatube_requests_total', view=view, method=method, status=str(status)
+    ))
+    name = 'yatube_request_duration_seconds'
+    for bound in BUCKETS:
+        if seconds <= bound:
+            values.add(_key(f'{name}_bucket', view=view, le=str(bound)))
+            break
+    else:
+        values.add(_key(f'{name}_bucket', view=view, le='+Inf'))
+    values.add(_key(f'{name}_count', view=view))
+    values.add(_key(f'{name}_sum', view=view), seconds)
+
+
+def collect():
+    '''Сумма значений из файлов всех процессов.'''
+    totals = defaultdict(float)
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+        with open(path, 'rb') as metrics_file:
+            data = metrics_file.read()
+        if len(data) < HEADER.size:
+            continue
+        for key, value, _ in _read_entries(data):
+            totals[key] += value
+    return totals
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format(name, labels, value):
+    text = ','.join(f'{label}="{_escape(val)}"' for label, val in labels)
+    return f'{name}{{{text}}} {value:g}' if text else f'{name} {value:g}'
+
+
+def _cumulative(samples):
+    '''В файлах корзины хранятся по отдельности, в выдаче - нарастающим
+    итогом, как требует формат.'''
+    bounds = [str(bound) for bound in BUCKETS] + ['+Inf']
+    by_view = defaultdict(dict)
+    for labels, value in samples:
+        labels = dict(labels)
+        by_view[labels['view']][labels['le']] = value
+    for view in sorted(by_view):
+        total = 0.0
+        for bound in bounds:
+            total += by_view[view].get(bound, 0.0)
+            yield (('view', view), ('le', bound)), total
+
+
+def render():
+    '''Метрики в текстовом формате Prometheus.'''
+    samples = defaultdict(list)
+    for key, value in collect().items():
+        name, labels = json.loads(key)
+        samples[name].append((tuple(map(tuple, labels)), value))
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        if kind == 'histogram':
+            for labels, value in _cumulative(samples[f'{metric}_bucket']):
+                lines.append(_format(f'{metric}_bucket', labels, value))
+            for suffix in ('_count', '_sum'):
+                for labels, value in sorted(samples[metric + suffix]):
+                    lines.append(_format(metric + suffix, labels, value))
+        else:
+            for labels, value in sorted(samples[metric]):
+                lines.append(_format(metric, labels, value))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,83 @@
+import logging
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, perf, profiler
+from .nplusone import QueryTracker
+
+logger = logging.getLogger(__name__)
+
+
+class PerfMiddleware:
+    '''Замеряет время запроса, запросы к базе, отрисовку шаблонов,
+    кэш и построение картинок и копит их в гистограммах по имени view.
+    Число запросов и время ответа также пишутся в метрики /metrics.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats, token = perf.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(
+                            stats.query_wrapper
+                        )
+                    )
+                response = self.get_response(request)
+        finally:
+            perf.finish(token)
+        elapsed = time.perf_counter() - started
+        stats['total'] = elapsed * 1000
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        perf.observe(view, stats)
+        # ответы обработчиков ошибок считаются под их именем
+        metrics.observe_request(
+            getattr(request, 'metrics_view', view), request.method,
+            response.status_code, elapsed,
+        )
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = stats.server_timing()
+        return response
+
+
+class NPlusOneMiddleware:
+    '''В разработке пишет в лог запросы, повторённые в одном ответе.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryTracker() as tracker:
+            response = self.get_response(request)
+        if tracker.problems():
+            logger.warning(
+                'N+1 в %s:\n%s', request.path, tracker.report()
+            )
+        return response
+
+
+class ProfilerMiddleware:
+    '''Профилирует запрос сотрудника с подписанным ключом в параметре
+    ?profile= или заголовке X-Profile, см. команду profiler_token.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiler.is_requested(request):
+            return self.get_response(request)
+        with profiler.Sampler() as sampler:
+            response = self.get_response(request)
+        match = request.resolver_match
+        name = match.url_name if match and match.url_name else 'unresolved'
+        response['X-Profile'] = os.path.basename(sampler.save(name))
+        return response
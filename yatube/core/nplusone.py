@@ -0,0 +1,102 @@
+import os
+import re
+import sys
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\?, )*\?\)')
+# файлы проекта, которые не считаются местом вызова запроса
+SKIPPED = ('core/nplusone.py', 'venv', 'env')
+
+
+def normalize(sql):
+    '''Форма запроса: значения заменены на ?, списки IN свёрнуты.'''
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+def _template_location(frame):
+    '''Строка шаблона, который сейчас отрисовывается, если есть.'''
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+def _code_location(frame):
+    '''Первая строка кода проекта в стеке вызова запроса.'''
+    base = str(settings.BASE_DIR) + os.sep
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base):
+            relative = filename[len(base):]
+            if not relative.startswith(SKIPPED):
+                return f'{relative}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
+class QueryTracker:
+    '''Собирает запросы к базе, сгруппированные по форме.
+
+    Форма, повторённая не меньше threshold раз, - признак N+1:
+    обычно это обращение к связанному объекту в цикле.
+    '''
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or settings.NPLUSONE_THRESHOLD
+        self.count = 0
+        self.shapes = defaultdict(list)
+        self._stack = ExitStack()
+
+    def _wrapper(self, execute, sql, params, many, context):
+        self.count += 1
+        frame = sys._getframe(1)
+        self.shapes[normalize(sql)].append(
+            _template_location(frame) or _code_location(frame)
+        )
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        for alias in connections:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self._wrapper)
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def problems(self):
+        '''[(число повторов, форма запроса, места вызова)]'''
+        return sorted(
+            (
+                (len(locations), sql, sorted(set(filter(None, locations))))
+                for sql, locations in self.shapes.items()
+                if len(locations) >= self.threshold
+            ),
+            reverse=True,
+        )
+
+    def report(self):
+        return '\n'.join(
+            f'{count} x {sql}\n    at {", ".join(places) or "?"}'
+            for count, sql, places in self.problems()
+        )
+
+
+def budget_key(match):
+    '''Имя view для бюджетов запросов: приложение и имя адреса.'''
+    return ':'.join([*match.app_names, match.url_name or match.view_name])
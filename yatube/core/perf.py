@@ -0,0 +1,169 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# верхние границы корзин гистограмм, мс
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+# что показывается в заголовке Server-Timing: метрика и описание,
+# заголовки HTTP допускают только ASCII
+TIMINGS = (
+    ('total', 'Request'),
+    ('db', 'Database'),
+    ('render', 'Templates'),
+    ('thumbnail', 'Images'),
+)
+# время вне запроса (фоновые потоки) копится под этим именем
+BACKGROUND = 'background'
+
+_current = ContextVar('perf_stats', default=None)
+_histograms = defaultdict(dict)
+_lock = threading.Lock()
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        '''Верхняя граница корзины, в которую попадает квантиль q.'''
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return BUCKETS[-1]
+
+
+class RequestStats(dict):
+    '''Счётчики одного запроса: время в мс и количества.'''
+
+    def __init__(self):
+        super().__init__(
+            db=0.0, db_count=0, render=0.0, thumbnail=0.0,
+            cache_hits=0, cache_misses=0,
+        )
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self['db'] += (time.perf_counter() - started) * 1000
+            self['db_count'] += 1
+
+    def server_timing(self):
+        parts = [
+            f'{name};dur={self[name]:.1f};desc="{desc}"'
+            for name, desc in TIMINGS if name in self
+        ]
+        parts.append(f'queries;desc="{self["db_count"]}"')
+        parts.append(
+            f'cache;desc="hits {self["cache_hits"]}, '
+            f'misses {self["cache_misses"]}"'
+        )
+        return ', '.join(parts)
+
+
+def start():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def observe(name, values):
+    with _lock:
+        histograms = _histograms[name]
+        for metric, value in values.items():
+            histograms.setdefault(metric, Histogram()).observe(value)
+
+
+@contextmanager
+def timer(metric):
+    '''Добавляет время блока к счётчику текущего запроса,
+    вне запроса - сразу в гистограмму фоновой работы.'''
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        stats = _current.get()
+        if stats is None:
+            observe(BACKGROUND, {metric: elapsed})
+        else:
+            stats[metric] += elapsed
+
+
+def record_cache(hits, misses):
+    stats = _current.get()
+    if stats is not None:
+        stats['cache_hits'] += hits
+        stats['cache_misses'] += misses
+
+
+def snapshot():
+    with _lock:
+        return {
+            name: {
+                metric: (
+                    histogram.count, histogram.sum,
+                    histogram.quantile(0.5), histogram.quantile(0.99),
+                )
+                for metric, histogram in histograms.items()
+            }
+            for name, histograms in _histograms.items()
+        }
+
+
+def dump():
+    '''Текстовая сводка гистограмм этого процесса.'''
+    lines = [
+        f'{"view":40} {"metric":12} {"count":>8} {"avg":>10} '
+        f'{"p50<=":>8} {"p99<=":>8}'
+    ]
+    for name, metrics in sorted(snapshot().items()):
+        for metric, (count, total, p50, p99) in sorted(metrics.items()):
+            lines.append(
+                f'{name:40} {metric:12} {count:8} {total / count:10.2f} '
+                f'{p50:8g} {p99:8g}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def install():
+    '''Подключает замер времени отрисовки шаблонов.'''
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'perf_timed', False):
+        return
+    render = Template.render
+
+    def timed_render(self, *args, **kwargs):
+        if _current.get() is None:
+            return render(self, *args, **kwargs)
+        with timer('render'):
+            return render(self, *args, **kwargs)
+
+    timed_render.perf_timed = True
+    Template.render = timed_render
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiler'
+PARAMETER = 'profile'
+HEADER = 'HTTP_X_PROFILE'
+
+
+def make_token():
+    '''Подписанный ключ, по которому сотрудник включает профилировщик.'''
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def is_requested(request):
+    token = request.GET.get(PARAMETER) or request.META.get(HEADER)
+    if not token or not request.user.is_staff:
+        return False
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILER_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _collapse(frame):
+    '''Стек кадра одной строкой от корня к листу, через ";".'''
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.relpath(code.co_filename, settings.BASE_DIR)
+        names.append(f'{code.co_name} ({filename}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    '''Снимает стек потока запроса из отдельного потока раз в interval
+    секунд. Сам запрос не замедляется ничем, кроме конкуренции за GIL.'''
+
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or settings.PROFILER_INTERVAL
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='profiler', daemon=True
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def save(self, name):
+        '''Пишет профиль в формате collapsed stacks, его открывают
+        speedscope и flamegraph.pl. Возвращает путь к файлу.'''
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        path = os.path.join(
+            settings.PROFILER_DIR,
+            f'{time.strftime("%Y%m%d-%H%M%S")}-{name}-{os.getpid()}.folded',
+        )
+        with open(path, 'w') as profile:
+            for stack, count in self.stacks.most_common():
+                profile.write(f'{stack} {count}\n')
+        return path
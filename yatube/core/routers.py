@@ -0,0 +1,116 @@
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = 'default'
+PIN_COOKIE = 'primary_db'
+
+_replica = ContextVar('replica', default=None)
+
+
+def current_replica():
+    '''Реплика, с которой читает текущий запрос, или None.'''
+    return _replica.get()
+
+
+def _synced_key(alias):
+    return f'core:replica:synced:{alias}'
+
+
+def mark_synced(alias, timestamp):
+    '''Запоминает время снимка основной базы, скопированного в реплику.'''
+    cache.set(_synced_key(alias), timestamp, None)
+
+
+def fresh_replicas(written=0):
+    '''Реплики, скопированные не раньше DATABASE_REPLICA_LAG секунд
+    назад и после записи в момент written. Реплика с неизвестным временем
+    копирования не используется.'''
+    synced = cache.get_many(
+        [_synced_key(alias) for alias in settings.DATABASE_REPLICAS]
+    )
+    oldest = max(time.time() - settings.DATABASE_REPLICA_LAG, written)
+    return [
+        alias for alias in settings.DATABASE_REPLICAS
+        if synced.get(_synced_key(alias), 0) > oldest
+    ]
+
+
+def _written(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        # кука без времени записи: считаем, что запись была только что
+        return time.time()
+
+
+class ReplicaRouter:
+    '''Чтение внутри read_from_replica идёт с реплики, всё остальное
+    и любые записи - с основной базы.'''
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # реплики - копии основной базы, схему в них не меняем
+        return db not in settings.DATABASE_REPLICAS
+
+
+def _load_user(request):
+    '''Загружает ленивый request.user, пока запросы идут в основную базу:
+    на реплике может ещё не быть только что зарегистрированного.'''
+    return request.user.is_authenticated
+
+
+def read_from_replica(view):
+    '''Выполняет view с чтением из случайной свежей реплики.
+
+    Отставание реплик измеряется по времени последнего sync_replicas:
+    реплики старше DATABASE_REPLICA_LAG не используются. Пользователь,
+    недавно что-то записавший (см. pin_to_primary), читает только
+    с реплик, скопированных после его записи, иначе с основной базы.
+    '''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS:
+            return view(request, *args, **kwargs)
+        replicas = fresh_replicas(_written(request))
+        if not replicas:
+            return view(request, *args, **kwargs)
+        _load_user(request)
+        token = _replica.set(random.choice(replicas))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+    return wrapper
+
+
+def pin_to_primary(view):
+    '''Для view, которые пишут в базу: кука хранит время записи, пока
+    реплики не скопированы после неё, пользователь читает с основной
+    базы. Позже DATABASE_REPLICA_LAG все используемые реплики свежее
+    записи, и кука больше не нужна.'''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if settings.DATABASE_REPLICAS:
+            # время после фиксации записи: реплика, скопированная
+            # позже, её уже содержит
+            response.set_cookie(
+                PIN_COOKIE, repr(time.time()),
+                max_age=settings.DATABASE_REPLICA_LAG,
+                httponly=True, samesite='Lax',
+            )
+        return response
+    return wrapper
@@ -0,0 +1,64 @@
+import logging
+import os
+import time
+
+from django.template import Engine, TemplateDoesNotExist, TemplateSyntaxError
+from django.template.base import Lexer
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = ('.html', '.txt')
+
+
+def template_names(engine):
+    '''Имена всех шаблонов из каталогов DIRS движка.'''
+    names = []
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    names.append(os.path.relpath(path, directory).replace(
+                        os.sep, '/'
+                    ))
+    return sorted(set(names))
+
+
+def compile_all(engine=None):
+    '''Компилирует все шаблоны через загрузчики движка.
+
+    С кэширующим загрузчиком скомпилированные шаблоны остаются в памяти
+    процесса. Возвращает строки (имя, разбор, компиляция) со временем
+    в секундах и словарь ошибок по именам шаблонов. Разбор - разбиение
+    исходника на лексемы, компиляция - всё получение шаблона вместе
+    с чтением файла и построением дерева узлов.
+    '''
+    engine = engine or Engine.get_default()
+    timings, errors = [], {}
+    for name in template_names(engine):
+        started = time.perf_counter()
+        try:
+            template = engine.get_template(name)
+        except (TemplateSyntaxError, TemplateDoesNotExist) as error:
+            errors[name] = error
+            continue
+        compiled = time.perf_counter() - started
+        started = time.perf_counter()
+        Lexer(template.source).tokenize()
+        timings.append((name, time.perf_counter() - started, compiled))
+    return timings, errors
+
+
+def warm_up():
+    '''Прогрев кэша шаблонов при старте воркера: первый запрос после
+    выкладки не тратит время на разбор.'''
+    started = time.perf_counter()
+    timings, errors = compile_all()
+    for name, error in errors.items():
+        logger.error('Шаблон %s не компилируется: %s', name, error)
+    logger.info(
+        'Скомпилировано шаблонов: %s за %.1f мс (разбор %.1f мс)',
+        len(timings), (time.perf_counter() - started) * 1000,
+        sum(parse for _, parse, _ in timings) * 1000,
+    )
+    return timings, errors
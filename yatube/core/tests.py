@@ -0,0 +1,356 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import metrics, perf, profiler
+from core.cache import SQLiteCache
+from core.checks import check_templates_compile
+from core.nplusone import QueryTracker, normalize
+from core.routers import (
+    PIN_COOKIE, ReplicaRouter, mark_synced, pin_to_primary,
+    read_from_replica,
+)
+from core.templates import compile_all
+from posts.page_cache import conditional_page
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2,
+        }})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_values_shared_between_instances(self):
+        '''Значения видны другому экземпляру кэша с тем же файлом,
+        как другому процессу сервера'''
+        self.cache.set('post', {'text': 'Тестовый пост'})
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('post'), {'text': 'Тестовый пост'})
+        other.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+
+    def test_incr_and_add(self):
+        '''incr меняет число на месте, add не перезаписывает значение'''
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 10), 11)
+        self.assertEqual(self.cache.decr('counter'), 10)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_values_not_returned(self):
+        '''Просроченные записи не возвращаются'''
+        self.cache.set('old', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('old'))
+        self.assertFalse(self.cache.has_key('old'))
+        self.assertTrue(self.cache.add('old', 'new'))
+
+    def test_least_recently_used_evicted(self):
+        '''При переполнении вытесняются давно не читанные записи'''
+        for i in range(10):
+            self.cache.set(f'key{i}', i)
+        self.cache._connection().execute(
+            "UPDATE cache SET accessed = 0 WHERE key LIKE '%key0'"
+        )
+        self.cache.set('key10', 10)
+        self.assertIsNone(self.cache.get('key0'))
+        self.assertEqual(self.cache.get('key10'), 10)
+
+    def test_size_checked_periodically(self):
+        '''Размер таблицы считается не при каждой записи'''
+        cache = SQLiteCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        }})
+        statements = []
+        cache._connection().set_trace_callback(statements.append)
+        for i in range(20):
+            cache.set(f'key{i}', i)
+        counts = [sql for sql in statements if 'COUNT(*)' in sql]
+        self.assertEqual(len(counts), 20 // cache._cull_every)
+        self.assertEqual(cache._cull_every, 5)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        mark_synced('replica1', time.time())
+        self.router = ReplicaRouter()
+        self.request = RequestFactory().get('/')
+        self.request.user = AnonymousUser()
+
+        @read_from_replica
+        def view(request):
+            return HttpResponse(str(self.router.db_for_read(None)))
+
+        self.view = view
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_reads_from_replica_inside_view(self):
+        '''Чтение в отмеченных view идёт с реплики, вне их - с основной'''
+        self.assertEqual(self.view(self.request).content, b'replica1')
+        self.assertIsNone(self.router.db_for_read(None))
+        self.assertEqual(self.router.db_for_write(None), 'default')
+
+    def test_stale_replica_not_used(self):
+        '''Реплика, не копированная дольше DATABASE_REPLICA_LAG или
+        с неизвестным временем копии, не читается'''
+        lag = settings.DATABASE_REPLICA_LAG
+        mark_synced('replica1', time.time() - lag - 1)
+        self.assertEqual(self.view(self.request).content, b'None')
+        cache.clear()
+        self.assertEqual(self.view(self.request).content, b'None')
+
+    def test_pinned_user_reads_primary(self):
+        '''После записи пользователь читает с основной базы, пока реплику
+        не скопируют заново'''
+        @pin_to_primary
+        def write(request):
+            return HttpResponse()
+
+        response = write(RequestFactory().post('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.view(self.request).content, b'None')
+        mark_synced('replica1', time.time() + 1)
+        self.assertEqual(self.view(self.request).content, b'replica1')
+
+    def test_no_validators_for_replica_pages(self):
+        '''Страница по данным реплики отдаётся без ETag и Last-Modified'''
+        view = read_from_replica(conditional_page(
+            lambda request: HttpResponse('страница')
+        ))
+        response = view(self.request)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        cache.clear()
+        self.assertIn('ETag', view(self.request))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertEqual(self.view(self.request).content, b'None')
+
+    def test_no_migrations_on_replica(self):
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+
+
+class SQLitePragmasTest(TestCase):
+    def test_pragmas_applied(self):
+        '''Соединение с базой получает настройки из SQLITE_PRAGMAS'''
+        with connection.cursor() as cursor:
+            for pragma, expected in (
+                ('busy_timeout', 5000),
+                ('synchronous', 1),
+                ('temp_store', 2),
+            ):
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+
+class PerfMiddlewareTest(TestCase):
+    def setUp(self):
+        perf.reset()
+
+    def test_server_timing_header(self):
+        '''В ответе есть разбивка времени запроса в Server-Timing'''
+        response = self.client.get('/')
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'db;dur=', 'render;dur=', 'cache;'):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    def test_histograms_by_view(self):
+        '''Замеры копятся в гистограммах по имени view'''
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/about/author/')
+        stats = perf.snapshot()
+        index = next(name for name in stats if name.endswith(':index'))
+        count, _, _, _ = stats[index]['total']
+        self.assertEqual(count, 2)
+        self.assertIn('db_count', stats[index])
+        self.assertIn(index, perf.dump())
+
+    def test_histogram_quantile(self):
+        histogram = perf.Histogram()
+        for value in (0.5, 3, 3, 40):
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 5)
+        self.assertEqual(histogram.quantile(0.99), 50)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(METRICS_DIR=self.directory)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_requests_counted(self):
+        '''Запросы считаются по view, ответы обработчиков ошибок -
+        под именем обработчика'''
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/no-such-page/')
+        text = self.client.get('/metrics').content.decode()
+        self.assertRegex(
+            text, r'yatube_requests_total\{method="GET",status="200",'
+                  r'view="[a-z]+:index"\} 2'
+        )
+        self.assertIn(
+            'yatube_requests_total{method="GET",status="404",'
+            'view="core:page_not_found"} 1', text
+        )
+        self.assertRegex(
+            text, r'yatube_request_duration_seconds_bucket\{view="[a-z]+:'
+                  r'index",le="\+Inf"\} 2'
+        )
+
+    def test_values_merged_across_processes(self):
+        '''Значения из файлов разных процессов складываются'''
+        key = metrics._key('yatube_requests_total', view='v', method='GET',
+                           status='200')
+        for name in ('1.db', '2.db'):
+            values = metrics.ValueFile(os.path.join(self.directory, name))
+            values.add(key, 3)
+        self.assertIn(
+            'yatube_requests_total{method="GET",status="200",view="v"} 6',
+            metrics.render(),
+        )
+
+    def test_file_grows(self):
+        '''Файл процесса расширяется, когда ключи не помещаются'''
+        path = os.path.join(self.directory, '1.db')
+        values = metrics.ValueFile(path)
+        for number in range(5000):
+            values.add(f'key{number}', number)
+        reopened = dict(metrics.collect())
+        self.assertEqual(reopened['key4999'], 4999)
+        self.assertEqual(len(reopened), 5000)
+        self.assertGreater(os.path.getsize(path), metrics.INITIAL_SIZE)
+
+
+class NPlusOneTest(TestCase):
+    def test_normalize(self):
+        '''Запросы с разными значениями имеют одну форму'''
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE a = 15 AND b = 'x''y' "
+                      "AND c IN (%s, %s, %s)"),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...)',
+        )
+
+    def test_repeated_queries_reported(self):
+        '''Повторённый в цикле запрос попадает в отчёт с местом вызова'''
+        users = User.objects.bulk_create(
+            User(username=f'user{number}') for number in range(6)
+        )
+        with QueryTracker(threshold=5) as tracker:
+            for user in users:
+                User.objects.get(username=user.username)
+        [(count, _, places)] = tracker.problems()
+        self.assertEqual(count, 6)
+        self.assertTrue(places[0].startswith('core/tests.py:'))
+        with QueryTracker(threshold=5) as tracker:
+            list(User.objects.all())
+        self.assertEqual(tracker.problems(), [])
+
+
+class ProfilerTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(PROFILER_DIR=self.directory)
+        self.settings.enable()
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_sampler_collects_stacks(self):
+        '''Профиль содержит стек работавшей функции'''
+        def busy():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        with profiler.Sampler(interval=0.001) as sampler:
+            busy()
+        self.assertTrue(any('busy' in stack for stack in sampler.stacks))
+        with open(sampler.save('test')) as profile:
+            stack, count = profile.readline().rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+
+    def test_staff_request_profiled(self):
+        '''Запрос сотрудника с ключом профилируется'''
+        response = self.client.get(
+            '/', {'profile': profiler.make_token()}
+        )
+        self.assertIn(response['X-Profile'], os.listdir(self.directory))
+
+    def test_profile_requires_staff_and_valid_token(self):
+        self.client.get('/', {'profile': 'fake'})
+        self.client.get('/', HTTP_X_PROFILE=profiler.make_token())
+        self.client.logout()
+        self.client.get('/', {'profile': profiler.make_token()})
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+
+class TemplatesTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_cached_loader_warmed_up(self):
+        '''Все шаблоны проекта компилируются и остаются в кэше загрузчика'''
+        engine = DjangoTemplates({
+            'NAME': 'cached', 'DIRS': [settings.TEMPLATES_DIR],
+            'APP_DIRS': False, 'OPTIONS': {'loaders': [(
+                'django.template.loaders.cached.Loader',
+                settings.TEMPLATE_LOADERS,
+            )]},
+        }).engine
+        timings, errors = compile_all(engine)
+        self.assertEqual(errors, {})
+        names = {name for name, _, _ in timings}
+        self.assertIn('includes/single_post.html', names)
+        self.assertIn('users/includes/card.html', names)
+        cached = engine.template_loaders[0].get_template_cache
+        self.assertEqual(len(cached), len(names))
+
+    def test_broken_template_fails_check(self):
+        '''Проверка при выкладке находит шаблон с ошибкой'''
+        with open(os.path.join(self.directory, 'broken.html'), 'w') as file:
+            file.write('{% if %}')
+        templates = [{
+            **settings.TEMPLATES[0],
+            'DIRS': [settings.TEMPLATES_DIR, self.directory],
+        }]
+        with override_settings(TEMPLATES=templates):
+            errors = check_templates_compile(None)
+        self.assertEqual([error.obj for error in errors], ['broken.html'])
+        self.assertEqual(errors[0].id, 'core.E001')
+        self.assertEqual(check_templates_compile(None), [])
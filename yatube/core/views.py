@@ -1,9 +1,27 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics, perf
+
 
 def page_not_found(request, exception):
+    request.metrics_view = 'core:page_not_found'
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 
 def csrf_failure(request, reason=''):
+    request.metrics_view = 'core:csrf_failure'
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def perf_report(request):
+    '''Гистограммы времени запросов процесса, который обработал запрос.'''
+    return HttpResponse(perf.dump(), content_type='text/plain; charset=utf-8')
+
+
+def metrics_view(request):
+    return HttpResponse(
+        metrics.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,218 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connection
+from django.urls import NoReverseMatch, reverse
+
+from .models import Group, User
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 20
+
+
+def _normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def _terms(*names):
+    '''Ключи для поиска по началу: вся строка и каждое слово в ней.'''
+    terms = set()
+    for name in map(_normalize, names):
+        if name:
+            terms.add(name)
+            terms.update(name.split())
+    return terms
+
+
+class PrefixIndex:
+    '''Отсортированный список ключей (ключ, тип, id), поиск по префиксу
+    делается бинарным поиском по нему.'''
+
+    def __init__(self, entries=()):
+        # при построении ключи сортируются один раз, а не вставкой
+        self._entries = {
+            (kind, pk): (terms, payload)
+            for kind, pk, terms, payload in entries
+        }
+        self._keys = sorted(
+            (term, *entry)
+            for entry, (terms, _) in self._entries.items()
+            for term in terms
+        )
+        self._lock = threading.Lock()
+
+    def add(self, kind, pk, terms, payload):
+        with self._lock:
+            self._discard((kind, pk))
+            self._entries[kind, pk] = (terms, payload)
+            for term in terms:
+                insort(self._keys, (term, kind, pk))
+
+    def remove(self, kind, pk):
+        with self._lock:
+            self._discard((kind, pk))
+
+    def _discard(self, entry):
+        terms, _ = self._entries.pop(entry, ((), None))
+        for term in terms:
+            i = bisect_left(self._keys, (term, *entry))
+            if i < len(self._keys) and self._keys[i] == (term, *entry):
+                del self._keys[i]
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        found, results = set(), []
+        with self._lock:
+            i = bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(results) < limit:
+                term, kind, pk = self._keys[i]
+                if not term.startswith(prefix):
+                    break
+                if (kind, pk) not in found:
+                    found.add((kind, pk))
+                    results.append(self._entries[kind, pk][1])
+                i += 1
+        return results
+
+
+def _user_entry(user):
+    full_name = f'{user.first_name} {user.last_name}'.strip()
+    return _terms(user.username, full_name), {
+        'type': 'user',
+        'label': full_name or user.username,
+        'username': user.username,
+        'url': reverse('posts:profile', args=[user.username]),
+    }
+
+
+def _group_entry(group):
+    try:
+        url = reverse('posts:group_posts', args=[group.slug])
+    except NoReverseMatch:
+        # на группу с недопустимым адресом ссылку не построить
+        return None
+    return _terms(group.title, group.slug), {
+        'type': 'group',
+        'label': group.title,
+        'slug': group.slug,
+        'url': url,
+    }
+
+
+_index = None
+_built = 0
+_build_lock = threading.Lock()
+# изменения, пришедшие во время фоновой перестройки; None - перестройки нет
+_pending = None
+# число вызовов reset(): индекс, начатый до сброса, не подменяет старый
+_resets = 0
+
+
+def _entries():
+    users = User.objects.filter(is_active=True).only(
+        'username', 'first_name', 'last_name'
+    )
+    for user in users.iterator():
+        yield ('user', user.pk, *_user_entry(user))
+    for group in Group.objects.only('title', 'slug').iterator():
+        entry = _group_entry(group)
+        if entry is not None:
+            yield ('group', group.pk, *entry)
+
+
+def build():
+    return PrefixIndex(_entries())
+
+
+def _refresh():
+    '''Строит новый индекс и подменяет им старый. Изменения, пришедшие
+    от сигналов за время построения, применяются к новому индексу.'''
+    global _index, _built, _pending
+    resets = _resets
+    try:
+        index = build()
+        with _build_lock:
+            if resets == _resets:
+                for change in _pending:
+                    change(index)
+                _index, _built = index, time.monotonic()
+    finally:
+        with _build_lock:
+            _pending = None
+        connection.close()
+
+
+def _start_refresh():
+    threading.Thread(
+        target=_refresh, name='autocomplete', daemon=True
+    ).start()
+
+
+def get_index():
+    '''Индекс строится при первом обращении, дальше раз в
+    POSTS_AUTOCOMPLETE_TTL секунд перестраивается в фоновом потоке.
+    Пока новый индекс строится, запросы получают прежний, между
+    перестройками он обновляется сигналами.'''
+    global _index, _built, _pending
+    index = _index
+    if index is not None:
+        if time.monotonic() - _built > settings.POSTS_AUTOCOMPLETE_TTL:
+            with _build_lock:
+                start = _pending is None and _index is index
+                if start:
+                    _pending = []
+            if start:
+                _start_refresh()
+        return index
+    with _build_lock:
+        if _index is None:
+            _index, _built = build(), time.monotonic()
+        return _index
+
+
+def reset():
+    global _index, _resets
+    with _build_lock:
+        _index = None
+        _resets += 1
+
+
+def _apply(change):
+    with _build_lock:
+        index = _index
+        if _pending is not None:
+            _pending.append(change)
+    if index is not None:
+        change(index)
+
+
+def update_user(user):
+    if _index is None and _pending is None:
+        return
+    if user.is_active:
+        entry = _user_entry(user)
+        _apply(lambda index: index.add('user', user.pk, *entry))
+    else:
+        remove('user', user.pk)
+
+
+def update_group(group):
+    if _index is None and _pending is None:
+        return
+    entry = _group_entry(group)
+    if entry is not None:
+        _apply(lambda index: index.add('group', group.pk, *entry))
+    else:
+        remove('group', group.pk)
+
+
+def remove(kind, pk):
+    _apply(lambda index: index.remove(kind, pk))
+
+
+def suggest(query, limit=DEFAULT_LIMIT):
+    return get_index().search(query, min(limit, MAX_LIMIT))
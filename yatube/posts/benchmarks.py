@@ -0,0 +1,165 @@
+import io
+import statistics
+import time
+
+from django.core.files.base import ContentFile
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from PIL import Image
+
+from . import thumbnails, urls
+from .models import Group, Post, User
+from .utils import get_feed, get_pagination_context
+
+# подписка и отписка меняют состояние друг друга, их вызовы чередуются
+PAIRED = {'profile_follow': 'profile_unfollow'}
+
+
+def summarize(latencies):
+    '''Запросы в секунду и перцентили времени ответа в мс.'''
+    # по одному замеру перцентили не посчитать: все они равны ему
+    cuts = (
+        statistics.quantiles(latencies, n=100)
+        if len(latencies) > 1 else latencies * 99
+    )
+    return {
+        'rps': round(len(latencies) / sum(latencies), 1),
+        'p50': round(cuts[49] * 1000, 3),
+        'p95': round(cuts[94] * 1000, 3),
+        'p99': round(cuts[98] * 1000, 3),
+    }
+
+
+def measure(call, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def _check(response, url):
+    if response.status_code >= 400:
+        raise RuntimeError(f'{url}: ответ {response.status_code}')
+
+
+def _sample_kwargs():
+    '''Аргументы адресов и пользователь, от имени которого идут замеры.
+
+    Аргументов, для которых в базе нет данных, в словаре нет.
+    '''
+    # самые тяжёлые страницы: крупнейшие группа и автор, а замеры идут
+    # от имени другого пишущего автора с наибольшим числом подписок,
+    # а без такого - от любого другого пользователя или самого автора
+    author = User.objects.order_by('-stats__posts_count').first()
+    others = User.objects.exclude(pk=author.pk).order_by(
+        '-stats__following_count'
+    )
+    user = (
+        others.filter(stats__posts_count__gt=0).first()
+        or others.first() or author
+    )
+    kwargs = {'username': author.username}
+    post = (
+        user.posts.order_by('-pk').first()
+        or author.posts.order_by('-pk').first()
+    )
+    if post is not None:
+        kwargs['post_id'] = post.pk
+    group = Group.objects.order_by('-posts_count').first()
+    if group is not None:
+        kwargs['slug'] = group.slug
+    return kwargs, user
+
+
+def view_benchmarks(repeat):
+    '''Замеры GET-запросов ко всем адресам posts.urls от имени
+    авторизованного пользователя: его страницы не берутся из кэша.'''
+    kwargs, user = _sample_kwargs()
+    client = Client()
+    client.force_login(user)
+    results = {}
+    for pattern in urls.urlpatterns:
+        name = pattern.name
+        converters = pattern.pattern.converters
+        if (
+            name in PAIRED.values()
+            or not set(converters) <= set(kwargs)
+            # на себя не подписаться
+            or name in PAIRED and kwargs['username'] == user.username
+        ):
+            continue
+        names = [name, *filter(None, [PAIRED.get(name)])]
+        paths = [
+            reverse(f'posts:{item}', kwargs={
+                key: kwargs[key] for key in converters
+            })
+            for item in names
+        ]
+        query = {'q': 'а'} if name in ('search', 'autocomplete') else {}
+        latencies = {item: [] for item in names}
+        for _ in range(repeat):
+            for item, path in zip(names, paths):
+                started = time.perf_counter()
+                response = client.get(path, query)
+                latencies[item].append(time.perf_counter() - started)
+                _check(response, path)
+        for item in names:
+            results[f'view:{item}'] = summarize(latencies[item])
+    return results
+
+
+def component_benchmarks(repeat):
+    '''Паджинатор и шаблоны отдельно от view.'''
+    request = RequestFactory().get('/')
+    request.user = User.objects.first()
+    feed = get_feed(Post.objects.all())
+    page_obj = get_pagination_context(feed, request)
+    post = page_obj[0]
+    return {
+        'get_pagination_context': measure(
+            lambda: list(get_pagination_context(feed, request)), repeat
+        ),
+        'template:single_post.html': measure(
+            lambda: render_to_string(
+                'includes/single_post.html', {'post': post}, request
+            ),
+            repeat,
+        ),
+        'template:paginator.html': measure(
+            lambda: render_to_string(
+                'includes/paginator.html', {'page_obj': page_obj}, request
+            ),
+            repeat,
+        ),
+    }
+
+
+def thumbnail_benchmark(repeat):
+    '''Построение всех вариантов картинки 1920x1080.'''
+    buffer = io.BytesIO()
+    Image.effect_noise((1920, 1080), 64).convert('RGB').save(buffer, 'JPEG')
+    post = Post.objects.create(
+        author=User.objects.first(), text='Картинка для замера',
+    )
+    post.image.save('bench.jpg', ContentFile(buffer.getvalue()))
+    return {'thumbnails': measure(
+        lambda: thumbnails.generate(post.pk, post.image.name, rebuild=True),
+        repeat,
+    )}
+
+
+def compare(results, baseline, threshold):
+    '''Замеры, у которых p95 вырос больше чем на threshold.'''
+    regressions = []
+    for scale, names in results.items():
+        for name, current in names.items():
+            before = baseline.get(scale, {}).get(name)
+            if before and current['p95'] > before['p95'] * (1 + threshold):
+                regressions.append(
+                    f'{scale} {name}: p95 {before["p95"]} -> '
+                    f'{current["p95"]} мс'
+                )
+    return regressions
@@ -0,0 +1,75 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import AuthorStats, Comment, Follow, Group, ImageBlob, Post, User
+
+
+def _bump(queryset, **deltas):
+    return queryset.update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def bump_author(user_id, **deltas):
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    # при удалении пользователя его счётчики уже могут быть удалены
+    if not _bump(stats, **deltas) and min(deltas.values()) > 0:
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        _bump(stats, **deltas)
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        _bump(Group.objects.filter(pk=group_id), posts_count=delta)
+
+
+def bump_post(post_id, delta):
+    if post_id is not None:
+        _bump(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+def bump_blob(name, delta):
+    if not name:
+        return
+    blobs = ImageBlob.objects.filter(name=name)
+    updates = {
+        'refcount': Greatest(F('refcount') + delta, 0),
+        'updated': timezone.now(),
+    }
+    if not blobs.update(**updates) and delta > 0:
+        ImageBlob.objects.get_or_create(name=name)
+        blobs.update(**updates)
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def recount():
+    '''Пересчитывает все счётчики по фактическим данным.'''
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk) for pk in User.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)],
+        ignore_conflicts=True,
+    )
+    AuthorStats.objects.update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+    Group.objects.update(posts_count=_count(Post, 'group'))
+    Post.objects.update(comments_count=_count(Comment, 'post'))
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name) for name in Post.objects.exclude(
+            image=''
+        ).values_list('image', flat=True).distinct()],
+        ignore_conflicts=True,
+    )
+    ImageBlob.objects.update(refcount=_count(Post, 'image'))
@@ -0,0 +1,46 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from . import url_builder
+from .utils import encode_cursor
+
+TEMPLATE = 'includes/single_post.html'
+
+
+def fragment_key(post):
+    '''Ключ зависит от времени изменения поста и от данных автора во
+    фрагменте: правка поста или его картинки, смена логина или имени
+    автора дают новый ключ, и старый фрагмент больше не читается.'''
+    author = md5(
+        f'{post.author.username}\n{post.author.get_full_name()}'.encode()
+    ).hexdigest()
+    return f'posts:fragment:{encode_cursor(post.updated, post.pk)}:{author}'
+
+
+def attach(posts):
+    '''Кладёт в post.fragment готовый HTML includes/single_post.html.
+
+    Фрагменты всех постов страницы читаются из кэша одним get_many,
+    шаблон рендерится только для отсутствующих. Один пост выглядит
+    одинаково в любой ленте, поэтому фрагменты общие для всех страниц
+    и пользователей. Адреса ссылок поста готовятся заранее в post.urls.
+    '''
+    posts = url_builder.attach(list(posts))
+    keys = {fragment_key(post): post for post in posts}
+    fragments = cache.get_many(list(keys))
+    missing = {}
+    template = None
+    for key, post in keys.items():
+        if key not in fragments:
+            template = template or get_template(TEMPLATE)
+            missing[key] = template.render({'post': post})
+    if missing:
+        cache.set_many(missing, settings.POSTS_FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(missing)
+    for key, post in keys.items():
+        post.fragment = mark_safe(fragments[key])
+    return posts
@@ -0,0 +1,78 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# кадр 960x339 с обрезкой по центру, как прежняя миниатюра sorl
+ASPECT = 339 / 960
+WIDTHS = (480, 960)
+FALLBACK_FORMAT = 'jpeg'
+QUALITY = {'avif': 60, 'webp': 80, 'jpeg': 85}
+
+
+def modern_formats():
+    '''Современные форматы, которые умеет записывать установленный Pillow.'''
+    Image.init()
+    return [fmt for fmt in ('avif', 'webp') if fmt.upper() in Image.SAVE]
+
+
+def variant_name(image_name, width, fmt):
+    stem = os.path.splitext(image_name)[0]
+    return f'variants/{stem}_{width}.{fmt}'
+
+
+def existing_formats(image_name):
+    '''Современные форматы уже построенных вариантов картинки
+    или None, если вариантов нет.'''
+    if not default_storage.exists(
+        variant_name(image_name, max(WIDTHS), FALLBACK_FORMAT)
+    ):
+        return None
+    return [
+        fmt for fmt in modern_formats()
+        if default_storage.exists(variant_name(image_name, max(WIDTHS), fmt))
+    ]
+
+
+def build_variants(image):
+    '''Строит варианты картинки всех ширин и форматов.
+
+    Возвращает список построенных современных форматов,
+    JPEG строится всегда.
+    '''
+    with image.storage.open(image.name) as source:
+        frame = Image.open(source)
+        frame = ImageOps.exif_transpose(frame).convert('RGB')
+    formats = modern_formats()
+    for width in WIDTHS:
+        resized = ImageOps.fit(
+            frame, (width, round(width * ASPECT)), Image.LANCZOS
+        )
+        for fmt in (*formats, FALLBACK_FORMAT):
+            buffer = BytesIO()
+            resized.save(buffer, fmt.upper(), quality=QUALITY[fmt])
+            name = variant_name(image.name, width, fmt)
+            default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+    return formats
+
+
+def delete_variants(image_name):
+    for width in WIDTHS:
+        for fmt in ('avif', 'webp', FALLBACK_FORMAT):
+            default_storage.delete(variant_name(image_name, width, fmt))
+
+
+def fallback_url(image_name):
+    return default_storage.url(
+        variant_name(image_name, max(WIDTHS), FALLBACK_FORMAT)
+    )
+
+
+def srcset(image_name, fmt):
+    return ', '.join(
+        f'{default_storage.url(variant_name(image_name, width, fmt))} {width}w'
+        for width in WIDTHS
+    )
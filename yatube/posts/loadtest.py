@@ -0,0 +1,266 @@
+import asyncio
+import io
+import random
+import re
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from PIL import Image
+
+CSRF_RE = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class Session:
+    '''Пользователь сайта: одно keep-alive соединение и свои cookies.
+
+    Клиент HTTP/1.1 на asyncio-потоках: тысячи сессий живут в одном
+    процессе без потоков. Перенаправления не выполняются.
+    '''
+
+    def __init__(self, base_url, stats):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.stats = stats
+        self.cookies = {}
+        self._reader = self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port
+        )
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _read_body(self, headers):
+        if headers.get('transfer-encoding') == 'chunked':
+            body = b''
+            while True:
+                size = int((await self._reader.readline()).strip(), 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    return body
+                body += chunk[:-2]
+        return await self._reader.readexactly(
+            int(headers.get('content-length', 0))
+        )
+
+    async def _exchange(self, request):
+        if self._writer is None:
+            await self._connect()
+        self._writer.write(request)
+        await self._writer.drain()
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError('Сервер закрыл соединение')
+        status = int(status_line.split()[1])
+        headers, cookies = {}, []
+        while True:
+            line = (await self._reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, value = line.split(':', 1)
+            if name.lower() == 'set-cookie':
+                cookies.append(value)
+            headers[name.lower()] = value.strip()
+        body = await self._read_body(headers)
+        for cookie in cookies:
+            for morsel in SimpleCookie(cookie).values():
+                self.cookies[morsel.key] = morsel.value
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, headers, body
+
+    def _build(self, method, path, body, content_type):
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Connection: keep-alive',
+            f'Referer: http://{self.host}:{self.port}{path}',
+        ]
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(
+                f'{key}={value}' for key, value in self.cookies.items()
+            ))
+        if body is not None:
+            lines.append(f'Content-Type: {content_type}')
+            lines.append(f'Content-Length: {len(body)}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode() + (body or b'')
+
+    async def request(self, name, method, path, body=None,
+                      content_type='application/x-www-form-urlencoded'):
+        '''Выполняет запрос и записывает время ответа под именем name.'''
+        request = self._build(method, path, body, content_type)
+        started = time.perf_counter()
+        try:
+            try:
+                response = await self._exchange(request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # сервер закрыл простаивавшее соединение: повторяем
+                await self.close()
+                response = await self._exchange(request)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            await self.close()
+            self.stats.record(name, time.perf_counter() - started, None)
+            return None, {}, b''
+        status = response[0]
+        self.stats.record(name, time.perf_counter() - started, status)
+        return response
+
+    async def form_token(self, name, path):
+        _, _, body = await self.request(name, 'GET', path)
+        match = CSRF_RE.search(body)
+        return match.group(1).decode() if match else ''
+
+    async def post_form(self, name, path, fields, token):
+        fields = {'csrfmiddlewaretoken': token, **fields}
+        return await self.request(
+            name, 'POST', path, urlencode(fields).encode()
+        )
+
+    async def post_multipart(self, name, path, fields, files, token):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for key, value in {'csrfmiddlewaretoken': token, **fields}.items():
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; '
+                f'name="{key}"\r\n\r\n{value}\r\n'.encode()
+            )
+        for key, (filename, content) in files.items():
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; '
+                f'name="{key}"; filename="{filename}"\r\n'
+                'Content-Type: image/jpeg\r\n\r\n'.encode()
+                + content + b'\r\n'
+            )
+        parts.append(f'--{boundary}--\r\n'.encode())
+        return await self.request(
+            name, 'POST', path, b''.join(parts),
+            f'multipart/form-data; boundary={boundary}',
+        )
+
+    async def login(self, username, password):
+        token = await self.form_token('login_form', '/auth/login/')
+        status, _, _ = await self.post_form(
+            'login', '/auth/login/',
+            {'username': username, 'password': password}, token,
+        )
+        return status == 302
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, status):
+        self.latencies[name].append(seconds)
+        if status is None or status >= 400:
+            self.errors[name] += 1
+
+    def report(self, duration):
+        '''Строки: имя, запросов в секунду, p50/p95/p99 в мс, доля ошибок.'''
+        rows = []
+        for name, latencies in sorted(self.latencies.items()):
+            cuts = (
+                statistics.quantiles(latencies, n=100)
+                if len(latencies) > 1 else latencies * 99
+            )
+            rows.append((
+                name, len(latencies) / duration,
+                cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000,
+                self.errors[name] / len(latencies),
+            ))
+        return rows
+
+
+def make_image():
+    buffer = io.BytesIO()
+    color = tuple(random.randrange(256) for _ in range(3))
+    Image.new('RGB', (640, 360), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class Scenarios:
+    '''Сценарии поведения посетителей. Каждый сценарий - одна
+    «сессия» действий, после которой пользователь делает паузу.'''
+
+    def __init__(self, groups, hot_post, think_time):
+        self.groups = groups
+        self.hot_post = hot_post
+        self.think_time = think_time
+
+    async def pause(self):
+        if self.think_time > 0:
+            await asyncio.sleep(random.expovariate(1 / self.think_time))
+        else:
+            await asyncio.sleep(0)
+
+    async def browse(self, session):
+        '''Аноним листает главную и ленты групп.'''
+        await session.request('index', 'GET', '/')
+        if self.groups:
+            slug = random.choice(self.groups)
+            await session.request('group_posts', 'GET', f'/group/{slug}/')
+
+    async def follow_feed(self, session):
+        await session.request('follow_index', 'GET', '/follow/')
+
+    async def create_posts(self, session):
+        '''Серия публикаций с картинками.'''
+        for _ in range(random.randint(1, 3)):
+            token = await session.form_token('post_create_form', '/create/')
+            await session.post_multipart(
+                'post_create', '/create/',
+                {'text': f'Нагрузочный пост {uuid.uuid4().hex[:8]}'},
+                {'image': ('load.jpg', make_image())}, token,
+            )
+
+    async def comment_storm(self, session):
+        '''Много комментариев к одному популярному посту подряд.'''
+        path = f'/posts/{self.hot_post}/'
+        token = await session.form_token('post_detail', path)
+        for _ in range(random.randint(3, 10)):
+            await session.post_form(
+                'add_comment', f'{path}comment/',
+                {'text': 'Нагрузочный комментарий'}, token,
+            )
+
+
+async def run_user(base_url, stats, scenarios, mix, credentials, deadline):
+    '''Один посетитель: анонимные сценарии без входа, остальные -
+    после входа под своим пользователем.'''
+    session = Session(base_url, stats)
+    logged_in = False
+    names, weights = zip(*mix.items())
+    try:
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            if name != 'browse' and not logged_in:
+                logged_in = await session.login(*credentials)
+                if not logged_in:
+                    continue
+            await getattr(scenarios, name)(session)
+            await scenarios.pause()
+    finally:
+        await session.close()
+
+
+async def run(base_url, users, duration, mix, credentials, scenarios):
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        run_user(
+            base_url, stats, scenarios, mix,
+            credentials[number % len(credentials)], deadline,
+        )
+        for number in range(users)
+    ))
+    return stats
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок по существующим подпискам'
+
+    def handle(self, *args, **options):
+        count = timeline.fill_all()
+        self.stdout.write(
+            self.style.SUCCESS(f'Добавлено записей в ленты: {count}')
+        )
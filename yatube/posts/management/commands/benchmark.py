@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import benchmarks
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет запросы в секунду и p50/p95/p99 для адресов posts.urls, '
+        'паджинатора, шаблонов и миниатюр на временной базе нескольких '
+        'размеров и сравнивает с сохранённым JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default='1000,10000',
+            help='Числа постов через запятую',
+        )
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'benchmark.json'),
+        )
+        parser.add_argument(
+            '--save', action='store_true',
+            help='Записать результаты как новую базовую линию',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базовой линии',
+        )
+
+    def _seed(self, scale):
+        # данные докладываются к уже созданным до нужного размера
+        missing = scale - Post.objects.count()
+        if missing > 0:
+            call_command(
+                'generate_data', posts=missing, users=max(missing // 50, 10),
+                groups=max(missing // 1000, 2), comments=missing // 2,
+                images=2, stdout=StringIO(),
+            )
+
+    def _run(self, scales, repeat):
+        results = {}
+        for scale in scales:
+            self._seed(scale)
+            results[str(scale)] = {
+                **benchmarks.view_benchmarks(repeat),
+                **benchmarks.component_benchmarks(repeat),
+                **benchmarks.thumbnail_benchmark(max(repeat // 10, 2)),
+            }
+            for name, values in results[str(scale)].items():
+                self.stdout.write(
+                    f'{scale:>8} {name:36} {values["rps"]:>9} rps '
+                    f'p50 {values["p50"]:>8} p95 {values["p95"]:>8} '
+                    f'p99 {values["p99"]:>8} мс'
+                )
+        return results
+
+    def handle(self, *args, **options):
+        scales = [int(scale) for scale in options['scales'].split(',')]
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть не меньше 1')
+        media = tempfile.mkdtemp()
+        # отдельная база, кэш и каталог картинок: рабочие данные не
+        # трогаются, страницы не берутся из старого кэша
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            with override_settings(
+                MEDIA_ROOT=media, POSTS_THUMBNAIL_WORKERS=0,
+                # поиск N+1 разворачивает стек на каждом запросе к базе
+                MIDDLEWARE=[
+                    name for name in settings.MIDDLEWARE
+                    if name != 'core.middleware.NPlusOneMiddleware'
+                ],
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+                }},
+            ):
+                results = self._run(scales, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(media, ignore_errors=True)
+        if options['save']:
+            with open(options['baseline'], 'w') as baseline:
+                json.dump(results, baseline, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(
+                f'Базовая линия записана в {options["baseline"]}'
+            ))
+            return
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline']) as baseline:
+            regressions = benchmarks.compare(
+                results, json.load(baseline), options['threshold']
+            )
+        if regressions:
+            raise CommandError(
+                'Замедление больше допустимого:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Замедлений нет'))
@@ -0,0 +1,91 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.search import CREATE_SQL, TABLE, to_match
+
+WORDS = (
+    'кот собака дом река лес город поезд море солнце дождь книга окно '
+    'утро вечер дорога песня письмо сад мост гора ветер снег поле звезда'
+).split()
+# редкие слова встречаются примерно в одном посте из тысячи
+RARE_WORDS = ('жираф', 'вулкан', 'маяк')
+RARE_RATE = 0.001
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время поиска через FTS5 и через LIKE '
+        'на временной базе с синтетическими постами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _fill(self, connection, count, seed):
+        rng = random.Random(seed)
+        connection.execute(
+            'CREATE TABLE posts_post (id INTEGER PRIMARY KEY, text TEXT)'
+        )
+        connection.execute(CREATE_SQL)
+        batch = 10000
+        for start in range(0, count, batch):
+            rows = []
+            for pk in range(start + 1, min(start + batch, count) + 1):
+                words = rng.choices(WORDS, k=rng.randint(5, 40))
+                if rng.random() < RARE_RATE:
+                    words.append(rng.choice(RARE_WORDS))
+                rows.append((pk, ' '.join(words)))
+            connection.executemany(
+                'INSERT INTO posts_post VALUES (?, ?)', rows
+            )
+            connection.executemany(
+                f'INSERT INTO {TABLE} (rowid, text) VALUES (?, ?)', rows
+            )
+        connection.execute(
+            f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')"
+        )
+        connection.commit()
+
+    def _measure(self, connection, sql, params, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            connection.execute(sql, params).fetchall()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    def handle(self, *args, **options):
+        queries = ('жираф', 'маяк река', 'вулк', 'утро дорога')
+        with tempfile.TemporaryDirectory() as directory:
+            connection = sqlite3.connect(os.path.join(directory, 'bench.db'))
+            started = time.perf_counter()
+            self._fill(connection, options['posts'], options['seed'])
+            self.stdout.write(
+                f'{options["posts"]} постов подготовлено за '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+            for query in queries:
+                fts = self._measure(
+                    connection,
+                    f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH ? '
+                    'ORDER BY rank LIMIT 11',
+                    [to_match(query)], options['repeat'],
+                )
+                like = self._measure(
+                    connection,
+                    'SELECT id FROM posts_post WHERE text LIKE ? '
+                    'ORDER BY id DESC LIMIT 11',
+                    [f'%{query}%'], options['repeat'],
+                )
+                self.stdout.write(
+                    f'{query!r}: FTS5 {fts:.2f} мс, LIKE {like:.2f} мс'
+                )
+            connection.close()
@@ -0,0 +1,78 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import images
+from posts.models import ImageBlob, Post
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы картинок постов и их варианты, '
+            'на которые не ссылается ни один пост')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=24,
+            help='Не трогать файлы моложе стольких часов (по умолчанию 24)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+
+    def walk(self, storage, directory):
+        directories, files = storage.listdir(directory)
+        for name in files:
+            yield posixpath.join(directory, name)
+        for name in directories:
+            yield from self.walk(storage, posixpath.join(directory, name))
+
+    def collect(self, storage, names, cutoff, dry_run):
+        referenced = set(ImageBlob.objects.filter(
+            name__in=names, refcount__gt=0
+        ).values_list('name', flat=True))
+        # на случай расхождения счётчиков сверяемся с самими постами
+        referenced.update(Post.objects.filter(
+            image__in=names
+        ).values_list('image', flat=True))
+        # недавно освобождённые файлы тоже ждут окончания срока
+        referenced.update(ImageBlob.objects.filter(
+            name__in=names, updated__gte=cutoff
+        ).values_list('name', flat=True))
+        orphans = [
+            name for name in names
+            if name not in referenced
+            and storage.get_modified_time(name) < cutoff
+        ]
+        if not dry_run:
+            for name in orphans:
+                storage.delete(name)
+                images.delete_variants(name)
+            ImageBlob.objects.filter(name__in=orphans).delete()
+        for name in orphans:
+            self.stdout.write(name)
+        return len(orphans)
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        upload_to = Post._meta.get_field('image').upload_to.rstrip('/')
+        if not storage.exists(upload_to):
+            return
+        cutoff = timezone.now() - timedelta(hours=options['grace'])
+        removed, batch = 0, []
+        for name in self.walk(storage, upload_to):
+            batch.append(name)
+            if len(batch) == BATCH_SIZE:
+                removed += self.collect(
+                    storage, batch, cutoff, options['dry_run']
+                )
+                batch = []
+        if batch:
+            removed += self.collect(storage, batch, cutoff, options['dry_run'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено файлов: {removed}')
+        )
@@ -0,0 +1,257 @@
+import io
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import autocomplete, counters, page_cache, search
+from posts.models import Comment, Follow, Group, Post, User
+
+# готовые фразы и имена: Faker медленный, а строк нужны миллионы
+POOL_SIZE = 2000
+
+
+def zipf_weights(count, alpha):
+    '''Накопленные веса степенного распределения для random.choices.'''
+    return list(accumulate(1 / (rank + 1) ** alpha for rank in range(count)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками со степенным распределением'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя',
+        )
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Сколько разных картинок сделать для постов',
+        )
+        parser.add_argument(
+            '--image-rate', type=float, default=0.2,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch', type=int, default=5000)
+        parser.add_argument(
+            '--password', default='password',
+            help='Пароль всех созданных пользователей',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--no-timeline', action='store_true',
+            help='Не раскладывать посты по лентам подписчиков',
+        )
+        parser.add_argument('--locale', default='ru_RU')
+
+    def _write(self, model, names, rows):
+        '''Записывает строки пачками по --batch, не держа в памяти все.
+
+        Вставка идёт через executemany в обход моделей: bulk_create
+        тратит большую часть времени на подготовку значений. Поля, которых
+        нет в names, получают значения по умолчанию.
+        '''
+        rest = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key and field.name not in names
+        ]
+        columns = [model._meta.get_field(name).column for name in names]
+        columns += [field.column for field in rest]
+        defaults = tuple(
+            field.get_db_prep_save(field.get_default(), connection)
+            for field in rest
+        )
+        sql = (
+            f'INSERT INTO {model._meta.db_table} ({", ".join(columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))})'
+        )
+        rows, done = iter(rows), 0
+        batch = list(islice(rows, self.batch))
+        while batch:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, [row + defaults for row in batch])
+            done += len(batch)
+            self.stdout.write(
+                f'\r{model._meta.verbose_name_plural}: {done}', ending=''
+            )
+            batch = list(islice(rows, self.batch))
+        self.stdout.write('')
+
+    def _date(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def _pools(self, fake):
+        self.sentences = [fake.sentence() for _ in range(POOL_SIZE)]
+        self.first_names = [fake.first_name() for _ in range(POOL_SIZE)]
+        self.last_names = [fake.last_name() for _ in range(POOL_SIZE)]
+        self.logins = [
+            fake.user_name().replace('.', '_') for _ in range(POOL_SIZE)
+        ]
+
+    def _text(self, low, high):
+        return ' '.join(self.rng.choices(self.sentences, k=self.rng.randint(
+            low, high
+        )))
+
+    def _ids(self, model, before):
+        '''Номера записей, добавленных после before.'''
+        return list(model.objects.filter(pk__gt=before).values_list(
+            'pk', flat=True
+        ).order_by('pk'))
+
+    def create_users(self, count, password):
+        start = User.objects.aggregate(last=Max('pk'))['last'] or 0
+        password = make_password(password)
+        self._write(
+            User, ('username', 'first_name', 'last_name', 'password'),
+            ((
+                f'{self.rng.choice(self.logins)}{start + i}',
+                self.rng.choice(self.first_names),
+                self.rng.choice(self.last_names),
+                password,
+            ) for i in range(count)),
+        )
+        return self._ids(User, start)
+
+    def create_groups(self, count, fake):
+        start = Group.objects.aggregate(last=Max('pk'))['last'] or 0
+        self._write(
+            Group, ('title', 'slug', 'description'),
+            ((
+                fake.catch_phrase()[:200],
+                f'group-{start + i}',
+                self._text(1, 3),
+            ) for i in range(count)),
+        )
+        return self._ids(Group, start)
+
+    def create_images(self, count):
+        names = []
+        storage = Post._meta.get_field('image').storage
+        for number in range(count):
+            buffer = io.BytesIO()
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            Image.new('RGB', (960, 540), color).save(buffer, 'JPEG')
+            names.append(storage.save(
+                f'posts/seed-{number}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def create_posts(self, count, users, groups, images, options):
+        # популярные авторы пишут чаще, даты идут по возрастанию id
+        weights = zipf_weights(len(users), 1.1)
+        started = timezone.now() - timedelta(days=options['days'])
+        step = timedelta(days=options['days']) / max(count, 1)
+        start = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+
+        def make(i):
+            has_image = images and self.rng.random() < options['image_rate']
+            date = self._date(started + step * i)
+            return (
+                self._text(1, 6),
+                date,
+                date,
+                self.rng.choices(users, cum_weights=weights)[0],
+                self.rng.choice(groups)
+                if groups and self.rng.random() < 0.5 else None,
+                self.rng.choice(images) if has_image else '',
+            )
+
+        self._write(
+            Post, ('text', 'pub_date', 'updated', 'author', 'group', 'image'),
+            map(make, range(count)),
+        )
+        return start
+
+    def create_comments(self, count, users, first_post):
+        last_post = Post.objects.aggregate(last=Max('pk'))['last']
+        if last_post is None or last_post <= first_post:
+            return
+        now = timezone.now()
+
+        def make(i):
+            # свежие посты комментируют чаще старых
+            age = min(int(self.rng.paretovariate(1.2)) - 1,
+                      last_post - first_post - 1)
+            return (
+                last_post - age,
+                self.rng.choice(users),
+                self._text(1, 2),
+                self._date(
+                    now - timedelta(seconds=self.rng.randrange(86400))
+                ),
+            )
+
+        self._write(
+            Comment, ('post', 'author', 'text', 'created'),
+            map(make, range(count)),
+        )
+
+    def create_follows(self, users, mean):
+        # на немногих авторов подписано большинство: степенной закон
+        authors = users[:]
+        self.rng.shuffle(authors)
+        weights = zipf_weights(len(authors), 1.0)
+
+        def follows():
+            for user in users:
+                wanted = min(
+                    int(self.rng.paretovariate(2) * mean / 2), len(users) - 1
+                )
+                chosen = set(self.rng.choices(
+                    authors, cum_weights=weights, k=wanted
+                ))
+                chosen.discard(user)
+                for author in chosen:
+                    yield user, author
+
+        self._write(Follow, ('user', 'author'), follows())
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch = options['batch']
+        fake = Faker(options['locale'])
+        fake.seed_instance(options['seed'])
+        self._pools(fake)
+        started = time.monotonic()
+        users = self.create_users(options['users'], options['password'])
+        groups = self.create_groups(options['groups'], fake)
+        images = self.create_images(options['images'] if users else 0)
+        if users:
+            first_post = self.create_posts(
+                options['posts'], users, groups, images, options
+            )
+            self.create_comments(options['comments'], users, first_post)
+            self.create_follows(users, options['follows'])
+        # вставка в обход моделей не вызывает сигналы: счётчики, ленты и индекс
+        # поиска строятся по готовым данным
+        counters.recount()
+        if not options['no_timeline']:
+            call_command('backfill_timeline', stdout=self.stdout)
+        if search.is_available():
+            search.rebuild()
+        # закэшированные страницы и подсказки не знают о новых данных
+        page_cache.bump_generation()
+        autocomplete.reset()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.0f} с. Миниатюры '
+            'картинок строит команда generate_thumbnails'
+        ))
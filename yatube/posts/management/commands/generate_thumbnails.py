@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts import images, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Строит варианты картинок (ширины и форматы) для постов, '
+            'у которых их нет или они построены не во всех форматах')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перестроить варианты всех картинок',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['force']:
+            posts = posts.filter(
+                Q(thumbnail_url='')
+                | ~Q(image_formats=' '.join(images.modern_formats()))
+            )
+        count = 0
+        for pk, image in posts.values_list('pk', 'image').iterator():
+            if thumbnails.generate(pk, image, rebuild=options['force']):
+                count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {count}')
+        )
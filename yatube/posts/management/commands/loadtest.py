@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import loadtest
+from posts.models import Group, Post, User
+
+DEFAULT_MIX = 'browse=60,follow_feed=25,comment_storm=10,create_posts=5'
+
+
+def parse_mix(value):
+    '''Строка «сценарий=вес,...» в словарь весов.'''
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if not hasattr(loadtest.Scenarios, name) or name == 'pause':
+            raise CommandError(f'Неизвестный сценарий: {name}')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Неверный вес сценария {name}: {weight}')
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер смешанным трафиком от имени '
+        'пользователей из базы и выводит запросы в секунду, p50/p95/p99 '
+        'и долю ошибок по каждому адресу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--users', type=int, default=100,
+            help='Число одновременных посетителей',
+        )
+        parser.add_argument('--duration', type=float, default=60)
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help='Веса сценариев: browse, follow_feed, create_posts, '
+                 'comment_storm',
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=1.0,
+            help='Средняя пауза между сценариями в секундах',
+        )
+        parser.add_argument(
+            '--password', default='password',
+            help='Пароль пользователей, созданных generate_data',
+        )
+        parser.add_argument(
+            '--accounts', type=int, default=1000,
+            help='Из скольких пользователей базы выбирать учётные записи',
+        )
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        # самые читаемые авторы и популярные группы, как в живом трафике
+        usernames = list(User.objects.order_by(
+            '-stats__following_count', 'pk'
+        ).values_list('username', flat=True)[:options['accounts']])
+        if not usernames and set(mix) - {'browse'}:
+            raise CommandError(
+                'В базе нет пользователей, заполните её generate_data'
+            )
+        hot_post = Post.objects.order_by('-comments_count', '-pk').first()
+        if hot_post is None and 'comment_storm' in mix:
+            raise CommandError('В базе нет постов для comment_storm')
+        scenarios = loadtest.Scenarios(
+            groups=list(Group.objects.order_by('-posts_count').values_list(
+                'slug', flat=True
+            )[:20]),
+            hot_post=hot_post.pk if hot_post else None,
+            think_time=options['think_time'],
+        )
+        started = time.monotonic()
+        stats = asyncio.run(loadtest.run(
+            options['url'], options['users'], options['duration'], mix,
+            [(name, options['password']) for name in usernames] or [None],
+            scenarios,
+        ))
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{"адрес":20} {"rps":>9} {"p50":>9} {"p95":>9} {"p99":>9} '
+            f'{"ошибки":>7}'
+        )
+        for name, rps, p50, p95, p99, errors in stats.report(elapsed):
+            self.stdout.write(
+                f'{name:20} {rps:9.1f} {p50:9.1f} {p95:9.1f} {p99:9.1f} '
+                f'{errors:7.1%}'
+            )
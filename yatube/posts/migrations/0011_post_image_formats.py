@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_thumbnail_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_formats',
+            field=models.CharField(blank=True, editable=False, max_length=50, verbose_name='Форматы вариантов картинки'),
+        ),
+    ]
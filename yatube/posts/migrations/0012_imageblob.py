@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:42
+
+from django.db import migrations, models
+from django.db.models import Count
+import posts.storage
+
+
+def fill_blobs(apps, schema_editor):
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    Post = apps.get_model('posts', 'Post')
+    images = Post.objects.exclude(image='').order_by().values(
+        'image'
+    ).annotate(total=Count('pk'))
+    ImageBlob.objects.bulk_create(
+        ImageBlob(name=row['image'], refcount=row['total'])
+        for row in images.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_image_formats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+TABLE = 'posts_post_fts'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {TABLE} '
+        "USING fts5(text, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f'INSERT INTO {TABLE} (rowid, text) SELECT id, text FROM posts_post'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_imageblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
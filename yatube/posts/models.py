@@ -2,6 +2,9 @@ from django.db import models
 
 from django.contrib.auth import get_user_model
 
+from .images import FALLBACK_FORMAT, srcset
+from .storage import ContentAddressedStorage
+
 
 User = get_user_model()
 
@@ -10,6 +13,9 @@ class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='Название группы')
     slug = models.SlugField(unique=True, verbose_name='Адрес')
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Число постов'
+    )
 
     class Meta:
         verbose_name_plural = 'Группы'
@@ -23,6 +29,8 @@ class Post(models.Model):
                             help_text='Введите текст поста')
     pub_date = models.DateTimeField(auto_now_add=True,
                                     verbose_name='Дата публикации')
+    updated = models.DateTimeField(auto_now=True,
+                                   verbose_name='Дата изменения')
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -41,16 +49,44 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    thumbnail_url = models.CharField(
+        max_length=255, blank=True, editable=False,
+        verbose_name='Адрес миниатюры'
+    )
+    image_formats = models.CharField(
+        max_length=50, blank=True, editable=False,
+        verbose_name='Форматы вариантов картинки'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Число комментариев'
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def image_sources(self):
+        '''Пары (MIME-тип, srcset) для <picture>, JPEG последним.'''
+        formats = [*self.image_formats.split(), FALLBACK_FORMAT]
+        return [
+            (f'image/{fmt}', srcset(self.image.name, fmt))
+            for fmt in formats
+        ]
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -75,7 +111,12 @@ class Comment(models.Model):
     )
 
     class Meta:
+        ordering = ['created']
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -99,3 +140,65 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['author', 'user'],
                                     name='unique_follower')
         ]
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='follow_user_author_idx'),
+        ]
+
+
+class ImageBlob(models.Model):
+    name = models.CharField(max_length=255, primary_key=True,
+                            verbose_name='Имя файла')
+    refcount = models.PositiveIntegerField(default=0,
+                                           verbose_name='Число ссылок')
+    updated = models.DateTimeField(auto_now=True,
+                                   verbose_name='Дата изменения')
+
+    class Meta:
+        verbose_name_plural = 'Файлы картинок'
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Число постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Число подписок'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Счётчики авторов'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_post')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date_idx')
+        ]
@@ -0,0 +1,143 @@
+import math
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (
+    get_conditional_response, patch_vary_headers, quote_etag,
+)
+from django.utils.http import http_date
+
+from core.routers import current_replica
+
+FEEDS = 'feeds'
+
+
+def _generation_key(name):
+    return f'posts:generation:{name}'
+
+
+def _modified_key(name):
+    return f'posts:modified:{name}'
+
+
+def get_generations(*names):
+    keys = [_generation_key(name) for name in names]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # начальное значение от времени: после вытеснения счётчика
+            # страницы со старым поколением не оживут
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def get_modified(*names):
+    '''Время последнего изменения ресурсов в целых секундах.'''
+    keys = [_modified_key(name) for name in names]
+    modified = cache.get_many(keys)
+    for key in keys:
+        if key not in modified:
+            # время вытеснено из кэша: считаем, что ресурс изменился сейчас
+            cache.add(key, math.ceil(time.time()), None)
+            modified[key] = cache.get(key)
+    return max(modified.values())
+
+
+def bump_generation(name=FEEDS):
+    try:
+        cache.incr(_generation_key(name))
+    except ValueError:
+        cache.add(_generation_key(name), time.time_ns(), None)
+    # Last-Modified с точностью до секунды: два изменения за одну
+    # секунду должны дать разное время
+    key = _modified_key(name)
+    cache.set(
+        key, max(math.ceil(time.time()), cache.get(key, 0) + 1), None
+    )
+
+
+def post_generation(post_id):
+    return f'post:{post_id}'
+
+
+def _resource_names(kwargs):
+    names = [FEEDS]
+    if 'post_id' in kwargs:
+        names.append(post_generation(kwargs['post_id']))
+    return names
+
+
+def conditional_page(view):
+    '''Отвечает 304 Not Modified по ETag и Last-Modified, не выполняя view.
+
+    Валидаторы строятся из поколений кэша и времени их последнего
+    изменения, поэтому проверка стоит два чтения из кэша. ETag зависит
+    от пользователя: шапка и кнопки подписки у каждого свои. В ETag
+    входит и cookie CSRF: после входа токен меняется, и страница с
+    формой под старым токеном не должна отдаваться из кэша браузера.
+
+    Ответы по данным реплики идут без валидаторов: поколения в кэше
+    уже новые, а реплика может их ещё не содержать, и клиент сохранил бы
+    устаревшую страницу под свежим ETag.
+    '''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or current_replica():
+            return view(request, *args, **kwargs)
+        names = _resource_names(kwargs)
+        generations = '.'.join(map(str, get_generations(*names)))
+        csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+        etag = quote_etag(md5(
+            f'{generations}:{request.user.pk}:{csrf}:'
+            f'{request.get_full_path()}'.encode()
+        ).hexdigest())
+        # время изменения одно на всех, по нему проверяются только анонимы
+        last_modified = (
+            None if request.user.is_authenticated else get_modified(*names)
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def cache_anonymous_page(view):
+    '''Кэширует страницу целиком для анонимных GET-запросов.
+
+    Ключ включает поколения кэша: общее для лент и отдельное для
+    страницы поста, если во view передан post_id. Сигналы моделей
+    увеличивают поколения, и старые страницы больше не читаются.
+    '''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        names = _resource_names(kwargs)
+        path = md5(request.get_full_path().encode()).hexdigest()
+        generations = '.'.join(map(str, get_generations(*names)))
+        key = f'posts:page:{generations}:{path}'
+        response = cache.get(key)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                # страница с реплики может отставать от поколения в ключе
+                timeout = (
+                    settings.DATABASE_REPLICA_LAG if current_replica()
+                    else settings.POSTS_PAGE_CACHE_TIMEOUT
+                )
+                cache.set(key, response, timeout)
+        return response
+    return wrapper
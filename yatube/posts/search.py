@@ -0,0 +1,84 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+# дальше по выдаче не листают, а большой OFFSET не влезает в SQLite
+MAX_SEARCH_PAGE = 100
+WORD_RE = re.compile(r'\w+')
+CREATE_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} '
+    "USING fts5(text, tokenize='unicode61 remove_diacritics 2')"
+)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def to_match(query):
+    '''Переводит поисковую строку в запрос FTS5: все слова
+    обязательны, последнее ищется как префикс.'''
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_post(post):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def remove_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+        cursor.execute(CREATE_SQL)
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+def search_ids(query, limit, offset=0):
+    '''Номера постов, подходящих под запрос, по убыванию релевантности.'''
+    match = to_match(query)
+    if match is None:
+        return []
+    if not is_available():
+        posts = Post.objects.filter(text__icontains=query)
+        return list(posts.values_list('pk', flat=True)[offset:offset + limit])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            'ORDER BY rank LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_queryset(queryset, query):
+    '''Оставляет в queryset постов только подходящие под запрос.'''
+    match = to_match(query)
+    if match is None:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(text__icontains=query)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', (match,)
+    ))
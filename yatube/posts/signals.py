@@ -0,0 +1,125 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, counters, page_cache, search, thumbnails, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, raw=False, **kwargs):
+    instance._old_group_id, instance._old_image = None, ''
+    if instance.pk is not None and not raw:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        timeline.fan_out(instance)
+        counters.bump_author(instance.author_id, posts_count=1)
+        counters.bump_group(instance.group_id, 1)
+    elif instance._old_group_id != instance.group_id:
+        counters.bump_group(instance._old_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+    # имя картинки известно только после сохранения: одинаковый файл
+    # при редактировании получает прежнее имя
+    if instance.image.name != instance._old_image:
+        counters.bump_blob(instance.image.name, 1)
+        counters.bump_blob(instance._old_image, -1)
+        thumbnails.schedule(instance)
+
+
+@receiver(post_delete, sender=Post)
+def discount_post(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, posts_count=-1)
+    counters.bump_group(instance.group_id, -1)
+    counters.bump_blob(instance.image.name, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def discount_comment(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.add_author(instance.user_id, instance.author_id)
+        counters.bump_author(instance.author_id, followers_count=1)
+        counters.bump_author(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+    counters.bump_author(instance.author_id, followers_count=-1)
+    counters.bump_author(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_pages(sender, **kwargs):
+    page_cache.bump_generation()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_page(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        page_cache.bump_generation(
+            page_cache.post_generation(instance.post_id)
+        )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if search.is_available() and not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    if search.is_available():
+        search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def update_user_suggestions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.update_user(instance)
+
+
+@receiver(post_save, sender=Group)
+def update_group_suggestions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.update_group(instance)
+
+
+@receiver(post_delete, sender=User)
+def remove_user_suggestion(sender, instance, **kwargs):
+    autocomplete.remove('user', instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def remove_group_suggestion(sender, instance, **kwargs):
+    autocomplete.remove('group', instance.pk)
@@ -0,0 +1,54 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+TEMP_PREFIX = '.upload-'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    '''Хранилище картинок постов с именами по SHA-256 содержимого.
+
+    Хэш считается по ходу записи во временный файл. Если файл с таким
+    содержимым уже есть, временный удаляется и возвращается имя
+    существующего, так что повторные загрузки не занимают места.
+    Время изменения существующего файла обновляется: collect_images
+    не удалит его, пока новый пост не успел на него сослаться.
+    '''
+
+    def get_available_name(self, name, max_length=None):
+        # итоговое имя определяется содержимым в _save
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.path(directory), prefix=TEMP_PREFIX
+        )
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            digest = digest.hexdigest()
+            name = posixpath.join(directory, digest[:2], digest + extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
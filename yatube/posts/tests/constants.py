@@ -8,3 +8,5 @@ GROUP_POSTS_URL = reverse('posts:group_posts', args={'test-slug': TEST_SLUG})
 PROFILE_URL = reverse('posts:profile', args={'unknown': TEST_USER})
 POST_CREATE_URL = reverse('posts:post_create',)
 FOLLOW_INDEX_URL = reverse('posts:follow_index')
+SEARCH_URL = reverse('posts:search')
+AUTOCOMPLETE_URL = reverse('posts:autocomplete')
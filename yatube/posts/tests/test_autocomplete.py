@@ -0,0 +1,138 @@
+import time
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+
+from posts import autocomplete
+from posts.models import Group, User
+from posts.tests.constants import AUTOCOMPLETE_URL
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Лесные прогулки', slug='forest', description='Лес'
+        )
+
+    def setUp(self):
+        autocomplete.reset()
+        self.client = Client()
+
+    def tearDown(self):
+        autocomplete.reset()
+
+    def labels(self, query):
+        response = self.client.get(AUTOCOMPLETE_URL, {'q': query})
+        return [item['label'] for item in response.json()['results']]
+
+    def test_prefixes(self):
+        '''Подсказки ищутся по началу логина, имени и названия группы'''
+        for query, expected in (
+            ('le', ['Лев Толстой']),
+            ('тол', ['Лев Толстой']),
+            ('ле', ['Лев Толстой', 'Лесные прогулки']),
+            ('прог', ['Лесные прогулки']),
+            ('лев т', ['Лев Толстой']),
+            ('', []),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.labels(query), expected)
+
+    def test_incremental_updates(self):
+        '''Индекс обновляется сигналами без перестройки'''
+        autocomplete.get_index()
+        user = User.objects.create(username='pushkin')
+        self.assertEqual(self.labels('push'), ['pushkin'])
+        user.first_name, user.last_name = 'Александр', 'Пушкин'
+        user.save()
+        self.assertEqual(self.labels('push'), ['Александр Пушкин'])
+        self.assertEqual(self.labels('алекс'), ['Александр Пушкин'])
+        self.group.delete()
+        self.assertEqual(self.labels('прог'), [])
+
+    def test_limit(self):
+        '''Возвращается не больше limit подсказок'''
+        User.objects.bulk_create(
+            User(username=f'leon{i}') for i in range(30)
+        )
+        autocomplete.reset()
+        response = self.client.get(
+            AUTOCOMPLETE_URL, {'q': 'leon', 'limit': 5}
+        )
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertEqual(
+            len(autocomplete.suggest('leon', 100)), autocomplete.MAX_LIMIT
+        )
+
+    def test_bad_limit_parameter(self):
+        '''Неверный limit заменяется значением по умолчанию'''
+        User.objects.bulk_create(
+            User(username=f'leon{i}') for i in range(30)
+        )
+        autocomplete.reset()
+        for limit, expected in (('²', autocomplete.DEFAULT_LIMIT),
+                                ('0', autocomplete.DEFAULT_LIMIT),
+                                ('9' * 30, autocomplete.MAX_LIMIT)):
+            with self.subTest(limit=limit):
+                response = self.client.get(
+                    AUTOCOMPLETE_URL, {'q': 'leon', 'limit': limit}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), expected)
+
+    def test_no_queries_per_keystroke(self):
+        '''Построенный индекс отвечает без запросов к базе'''
+        index = autocomplete.PrefixIndex(
+            ('user', i, {f'user{i}'}, {'label': f'user{i}'})
+            for i in range(10000)
+        )
+        autocomplete.get_index()
+        with self.assertNumQueries(0):
+            autocomplete.suggest('le')
+        started = time.perf_counter()
+        index.search('user99')
+        self.assertLess(time.perf_counter() - started, 0.01)
+
+    def test_stale_index_rebuilt_in_background(self):
+        '''Устаревший индекс отвечает, пока новый строится в фоне;
+        изменения за время перестройки не теряются'''
+        autocomplete.get_index()
+        User.objects.bulk_create([User(username='leonid')])
+        started = []
+        with mock.patch.object(
+            autocomplete, '_start_refresh', lambda: started.append(True)
+        ), override_settings(POSTS_AUTOCOMPLETE_TTL=0):
+            with self.assertNumQueries(0):
+                self.assertEqual(self.labels('leon'), [])
+                self.labels('leon')
+        self.assertEqual(started, [True])
+        Group.objects.create(title='Леопарды', slug='leopards')
+        with mock.patch.object(autocomplete.connection, 'close'):
+            autocomplete._refresh()
+        self.assertEqual(
+            sorted(self.labels('leo')),
+            sorted(['Леопарды', 'Лев Толстой', 'leonid']),
+        )
+
+    def test_reset_during_refresh(self):
+        '''Индекс, построение которого началось до reset(), не
+        подменяет сброшенный'''
+        autocomplete.get_index()
+        build = autocomplete.build
+
+        def build_and_reset():
+            index = build()
+            autocomplete.reset()
+            return index
+
+        autocomplete._pending = []
+        with mock.patch.object(autocomplete, 'build', build_and_reset), \
+                mock.patch.object(autocomplete.connection, 'close'):
+            autocomplete._refresh()
+        self.assertIsNone(autocomplete._index)
+        self.assertIsNone(autocomplete._pending)
@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import benchmarks
+from posts.urls import urlpatterns
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class BenchmarksTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_data', users=10, groups=2, posts=30, comments=10,
+            images=1, stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_every_url_measured(self):
+        '''Замеряется каждый адрес posts.urls'''
+        results = benchmarks.view_benchmarks(repeat=2)
+        self.assertEqual(
+            set(results),
+            {f'view:{pattern.name}' for pattern in urlpatterns},
+        )
+        for values in results.values():
+            self.assertLessEqual(values['p50'], values['p99'])
+
+    def test_components_measured(self):
+        results = {
+            **benchmarks.component_benchmarks(repeat=2),
+            **benchmarks.thumbnail_benchmark(repeat=2),
+        }
+        self.assertEqual(set(results), {
+            'get_pagination_context', 'template:single_post.html',
+            'template:paginator.html', 'thumbnails',
+        })
+
+    def test_compare_with_baseline(self):
+        '''Рост p95 выше порога считается замедлением'''
+        baseline = {'1000': {'view:index': {'p95': 10.0}}}
+        slow = {'1000': {'view:index': {'p95': 12.5}}}
+        fine = {'1000': {'view:index': {'p95': 11.5}, 'new': {'p95': 1}}}
+        self.assertEqual(len(benchmarks.compare(slow, baseline, 0.2)), 1)
+        self.assertEqual(benchmarks.compare(fine, baseline, 0.2), [])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class MinimalDataBenchmarksTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_data', users=1, groups=0, posts=1, comments=0,
+            images=0, stdout=StringIO(),
+        )
+
+    def test_single_author_without_groups(self):
+        '''Один автор без групп и один повтор: адреса без данных
+        пропускаются, остальные замеряются'''
+        results = benchmarks.view_benchmarks(repeat=1)
+        self.assertIn('view:index', results)
+        self.assertIn('view:post_detail', results)
+        self.assertNotIn('view:group_posts', results)
+        self.assertNotIn('view:profile_follow', results)
+        for values in results.values():
+            self.assertEqual(values['p50'], values['p99'])
+        self.assertEqual(
+            set(benchmarks.component_benchmarks(repeat=1)),
+            {'get_pagination_context', 'template:single_post.html',
+             'template:paginator.html'},
+        )
@@ -1,14 +1,24 @@
+import os
 import shutil
 import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
 
 from http import HTTPStatus
 
 from django.conf import settings
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image
 
-from posts.models import Comment, Post, Group, User
+from posts import thumbnails
+from posts.images import WIDTHS, modern_formats, variant_name
+from posts.models import Comment, Group, ImageBlob, Post, User
 from posts.tests.constants import PROFILE_URL, POST_CREATE_URL
 
 
@@ -118,6 +128,114 @@ class PostFormTests(TestCase):
         self.assertEqual(self.post.text, form_data['text'])
         self.assertEqual(response.status_code, HTTPStatus.OK)
 
+    @override_settings(POSTS_THUMBNAIL_WORKERS=0)
+    def test_thumbnail_generated_on_create(self):
+        '''При создании поста с картинкой её варианты строятся заранее,
+        и адрес миниатюры сохраняется в посте'''
+        form_data = {
+            'text': 'Пост с миниатюрой',
+            'image': SimpleUploadedFile(
+                name='thumb.gif',
+                content=self.small_gif,
+                content_type='image/gif'
+            ),
+        }
+        self.authorized_client.post(POST_CREATE_URL, data=form_data)
+        post = Post.objects.get(text='Пост с миниатюрой')
+        self.assertTrue(
+            post.thumbnail_url.startswith(settings.MEDIA_URL + 'variants/')
+        )
+        self.assertEqual(post.image_formats, ' '.join(modern_formats()))
+        for width in WIDTHS:
+            with self.subTest(width=width):
+                self.assertTrue(post.image.storage.exists(
+                    variant_name(post.image.name, width, 'jpeg')
+                ))
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, post.thumbnail_url)
+        self.assertContains(response, '<source type="image/jpeg"')
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=2)
+    def test_worker_thumbnail_resets_page_cache(self):
+        '''Миниатюра из фонового потока сразу видна на закэшированных
+        страницах, а прежний ETag больше не даёт 304'''
+        buffer = BytesIO()
+        Image.effect_noise((64, 64), 64).convert('RGB').save(buffer, 'JPEG')
+        self.authorized_client.post(POST_CREATE_URL, data={
+            'text': 'Пост с фоновой миниатюрой',
+            'image': SimpleUploadedFile(
+                name='worker.jpg', content=buffer.getvalue(),
+                content_type='image/jpeg',
+            ),
+        })
+        post = Post.objects.get(text='Пост с фоновой миниатюрой')
+        self.assertEqual(post.thumbnail_url, '')
+        guest = Client()
+        detail_url = reverse('posts:post_detail', args=[post.pk])
+        etags = {url: guest.get(url)['ETag'] for url in ('/', detail_url)}
+        # то же, что делает поток пула после фиксации транзакции
+        thumbnails.generate(post.pk, post.image.name)
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_url)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response['ETag'], etag)
+                self.assertContains(response, post.thumbnail_url)
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=0)
+    def test_same_image_stored_once(self):
+        '''Одинаковые картинки хранятся одним файлом со счётчиком ссылок,
+        а файл без ссылок удаляет команда collect_images'''
+        for text in ('Первый', 'Второй'):
+            self.authorized_client.post(POST_CREATE_URL, data={
+                'text': text,
+                'image': SimpleUploadedFile(
+                    name='same.gif',
+                    content=self.small_gif,
+                    content_type='image/gif'
+                ),
+            })
+        first = Post.objects.get(text='Первый')
+        second = Post.objects.get(text='Второй')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image.name, self.post.image.name)
+        self.assertEqual(second.thumbnail_url, first.thumbnail_url)
+        blob = ImageBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.refcount, 3)
+        Post.objects.filter(image=first.image.name).delete()
+        call_command('collect_images', grace=0, stdout=StringIO())
+        self.assertFalse(first.image.storage.exists(first.image.name))
+        self.assertFalse(ImageBlob.objects.filter(pk=blob.pk).exists())
+
+    def test_recently_used_image_not_collected(self):
+        '''collect_images не удаляет файл, который недавно освободили
+        или заново загрузили, пока не истёк срок ожидания'''
+        name = self.post.image.name
+        storage = self.post.image.storage
+        day_ago = time.time() - 24 * 60 * 60
+
+        def collect():
+            call_command('collect_images', grace=1, stdout=StringIO())
+            return storage.exists(name)
+
+        Post.objects.filter(image=name).delete()
+        os.utime(storage.path(name), (day_ago, day_ago))
+        self.assertTrue(collect())
+        ImageBlob.objects.filter(name=name).update(
+            updated=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(
+            storage.save('posts/again.gif', ContentFile(self.small_gif)),
+            name,
+        )
+        self.assertTrue(collect())
+        os.utime(storage.path(name), (day_ago, day_ago))
+        self.assertFalse(collect())
+
     def test_post_edit_not_create_guest_client(self):
         '''При отправке валидной формы редактирования поста,
         изменения не произойдёт, если пользователь не авторизован'''
@@ -0,0 +1,84 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+
+from posts import autocomplete, page_cache
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Post, TimelineEntry, User,
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDataTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_data', users=30, groups=3, posts=200, comments=100,
+            follows=5, images=2, batch=50, stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_objects_created(self):
+        '''Команда создаёт все объекты и заполняет счётчики и ленты'''
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(AuthorStats.objects.count(), 30)
+        post = Post.objects.order_by('?').first()
+        self.assertEqual(
+            post.author.stats.posts_count,
+            Post.objects.filter(author=post.author).count(),
+        )
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(
+                author__following__user=follow.user
+            ).count(),
+        )
+
+    def test_dates_spread(self):
+        '''Даты постов растут вместе с id и не совпадают'''
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True
+        ))
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(len(set(dates)), len(dates))
+
+    def test_users_can_log_in(self):
+        '''Созданные пользователи входят с паролем из --password'''
+        user = User.objects.first()
+        self.assertTrue(Client().login(
+            username=user.username, password='password'
+        ))
+
+    def test_caches_reset(self):
+        '''После вставки в обход моделей страницы и подсказки
+        автодополнения строятся заново'''
+        generation = page_cache.get_generations(page_cache.FEEDS)
+        autocomplete.get_index()
+        call_command(
+            'generate_data', users=2, groups=0, posts=2, comments=0,
+            images=0, no_timeline=True, stdout=StringIO(),
+        )
+        self.assertNotEqual(
+            page_cache.get_generations(page_cache.FEEDS), generation
+        )
+        username = User.objects.order_by('-pk').first().username
+        self.assertIn(username, [
+            entry.get('username')
+            for entry in autocomplete.suggest(username, autocomplete.MAX_LIMIT)
+        ])
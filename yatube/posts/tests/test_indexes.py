@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, Group, Post, TimelineEntry, User
+from posts.utils import CursorPaginator
+
+
+class FeedIndexesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='unknown')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        cls.cursor = (timezone.now(), cls.post.pk)
+
+    def get_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.get_plan(queryset)
+        self.assertRegex(plan, f'USING (COVERING )?INDEX {index_name}')
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_feed_queries_use_indexes(self):
+        '''Проверяем, что запросы лент идут по своим индексам
+        без сортировки во временном B-дереве'''
+        feeds = {
+            'post_pub_date_idx': (Post.objects.all(), ('pub_date', 'pk')),
+            'post_author_pub_date_idx': (
+                self.user.posts.all(), ('pub_date', 'pk')
+            ),
+            'post_group_pub_date_idx': (
+                self.group.posts.all(), ('pub_date', 'pk')
+            ),
+            'timeline_user_pub_date_idx': (
+                TimelineEntry.objects.filter(user=self.user),
+                ('pub_date', 'post_id'),
+            ),
+        }
+        for index_name, (queryset, keys) in feeds.items():
+            paginator = CursorPaginator(queryset, 10, keys)
+            for values in (None, self.cursor):
+                for descending in (True, False):
+                    with self.subTest(index=index_name, cursor=values,
+                                      descending=descending):
+                        self.assertUsesIndex(
+                            paginator.page_queryset(values, descending),
+                            index_name,
+                        )
+
+    def test_comments_query_uses_index(self):
+        '''Проверяем, что комментарии поста выбираются по индексу'''
+        self.assertUsesIndex(
+            Comment.objects.filter(post=self.post),
+            'comment_post_created_idx',
+        )
@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, override_settings
+
+from posts.models import Comment, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class LoadTestCommandTest(LiveServerTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='secret')
+        self.author = User.objects.create_user('author', password='secret')
+        Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def loadtest(self, mix, duration=1):
+        # живой сервер тестов делит одно соединение с базой в памяти
+        # между потоками, поэтому посетитель один
+        out = StringIO()
+        call_command(
+            'loadtest', url=self.live_server_url, users=1, duration=duration,
+            mix=mix, think_time=0, password='secret', stdout=out,
+        )
+        return out.getvalue()
+
+    def test_scenarios_report(self):
+        '''Сценарии входят на сайт, пишут посты и комментарии,
+        отчёт содержит каждый адрес без ошибок'''
+        scenarios = {
+            'browse': ('index', 'group_posts'),
+            'follow_feed': ('login', 'follow_index'),
+            'create_posts': ('post_create_form', 'post_create'),
+            'comment_storm': ('post_detail', 'add_comment'),
+        }
+        for scenario, names in scenarios.items():
+            with self.subTest(scenario=scenario):
+                output = self.loadtest(f'{scenario}=1', duration=0.5)
+                for name in names:
+                    self.assertIn(name, output)
+                self.assertNotIn('%', output.replace(' 0.0%', ''))
+        self.assertTrue(Post.objects.filter(
+            text__startswith='Нагрузочный'
+        ).exists())
+        self.assertTrue(Comment.objects.exists())
+
+    def test_unknown_scenario(self):
+        with self.assertRaises(CommandError):
+            self.loadtest('browse=1,pause=1')
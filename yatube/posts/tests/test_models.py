@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Comment, Follow, Group, Post, User
+from posts.models import AuthorStats, Comment, Follow, Group, Post, User
 
 
 class PostModelTest(TestCase):
@@ -95,3 +98,51 @@ class PostModelTest(TestCase):
         actual_verbose_name_plural = Follow._meta.verbose_name_plural
         self.assertEqual(expected_verbose_name_plural,
                          actual_verbose_name_plural)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        '''Проверяем, что счётчики обновляются при записи'''
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.user, text='Текст')
+        follow = Follow.objects.create(user=self.follower, author=self.user)
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.get_stats(self.user).posts_count, 1)
+        self.assertEqual(self.get_stats(self.user).followers_count, 1)
+        self.assertEqual(self.get_stats(self.follower).following_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        follow.delete()
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.get_stats(self.user).posts_count, 0)
+        self.assertEqual(self.get_stats(self.user).followers_count, 0)
+        self.assertEqual(self.get_stats(self.follower).following_count, 0)
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_recount_fixes_drift(self):
+        '''Проверяем, что команда recount исправляет расхождения'''
+        Post.objects.create(author=self.user, text='Тестовый пост')
+        AuthorStats.objects.all().delete()
+        Group.objects.update(posts_count=5)
+        call_command('recount', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.get_stats(self.user).posts_count, 1)
+        self.assertEqual(self.group.posts_count, 0)
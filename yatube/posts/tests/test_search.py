@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+
+from posts import search
+from posts.search import MAX_SEARCH_PAGE
+from posts.models import Post, User
+from posts.tests.constants import SEARCH_URL
+from posts.utils import POSTS_PER_PAGE
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.river = Post.objects.create(
+            author=cls.author, text='Вечер у реки, река течёт'
+        )
+        cls.forest = Post.objects.create(
+            author=cls.author, text='Утро в лесу'
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_to_match(self):
+        '''Слова запроса обязательны, последнее ищется как префикс'''
+        self.assertEqual(search.to_match('Утро, лес'), '"утро" "лес"*')
+        self.assertIsNone(search.to_match('  ?! '))
+
+    def test_search_page(self):
+        '''Поиск находит посты по словам и по началу слова'''
+        for query, expected in (
+            ('река', [self.river]),
+            ('лес', [self.forest]),
+            ('РЕКА вечер', [self.river]),
+            ('пустыня', []),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(SEARCH_URL, {'q': query})
+                self.assertEqual(response.context['posts'], expected)
+
+    def test_index_follows_changes(self):
+        '''Индекс обновляется при правке и удалении поста'''
+        post = Post.objects.create(author=self.author, text='Старый текст')
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(search.search_ids('старый', 10), [])
+        self.assertEqual(search.search_ids('новый', 10), [post.pk])
+        post.delete()
+        self.assertEqual(search.search_ids('новый', 10), [])
+
+    def test_search_pagination(self):
+        '''Результаты поиска выводятся постранично'''
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Гора {i}')
+            for i in range(POSTS_PER_PAGE + 1)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        first = self.client.get(SEARCH_URL, {'q': 'гора'})
+        second = self.client.get(SEARCH_URL, {'q': 'гора', 'page': 2})
+        self.assertEqual(len(first.context['posts']), POSTS_PER_PAGE)
+        self.assertTrue(first.context['has_next'])
+        self.assertEqual(len(second.context['posts']), 1)
+        self.assertFalse(second.context['has_next'])
+
+    def test_bad_page_parameter(self):
+        '''Неверный или слишком большой номер страницы не ломает поиск'''
+        for page, expected in (('²', 1), ('-3', 1), ('abc', 1),
+                               ('9' * 30, MAX_SEARCH_PAGE)):
+            with self.subTest(page=page):
+                response = self.client.get(
+                    SEARCH_URL, {'q': 'гора', 'page': page}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page'], expected)
+
+    def test_admin_search(self):
+        '''Поиск в админке идёт через полнотекстовый индекс'''
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get('/admin/posts/post/', {'q': 'лес'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.forest]
+        )
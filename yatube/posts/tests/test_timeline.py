@@ -0,0 +1,57 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.tests.constants import FOLLOW_INDEX_URL
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='follower')
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_follow_fills_timeline(self):
+        '''После подписки посты автора попадают в ленту подписчика'''
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        response = self.authorized_client.get(FOLLOW_INDEX_URL)
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_new_post_fanned_out(self):
+        '''Новый пост автора раскладывается в ленты подписчиков'''
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        response = self.authorized_client.get(FOLLOW_INDEX_URL)
+        self.assertEqual(
+            list(response.context['page_obj']), [new_post, self.post]
+        )
+
+    def test_unfollow_trims_timeline(self):
+        '''После отписки посты автора убираются из ленты'''
+        Follow.objects.create(user=self.user, author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_backfill_command(self):
+        '''Команда backfill_timeline восстанавливает ленты по подпискам'''
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timeline', stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.post
+            ).exists()
+        )
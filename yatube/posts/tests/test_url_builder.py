@@ -0,0 +1,48 @@
+from django.test import TestCase
+from django.urls import reverse, set_script_prefix
+
+from posts import url_builder
+from posts.models import Group, Post, User
+from posts.tests.constants import INDEX_URL
+
+
+class UrlBuilderTest(TestCase):
+    def test_build_matches_reverse(self):
+        '''Адреса из строк формата совпадают с reverse'''
+        cases = {
+            'index': {},
+            'group_posts': {'slug': 'test-slug'},
+            'profile': {'username': 'user.name+1@example'},
+            'post_detail': {'post_id': 42},
+            'add_comment': {'post_id': 7},
+            'profile_follow': {'username': 'имя пользователя'},
+        }
+        for name, kwargs in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(
+                    url_builder.build(name, **kwargs),
+                    reverse(f'posts:{name}', kwargs=kwargs),
+                )
+
+    def test_script_prefix(self):
+        '''Строка формата своя для каждого префикса скрипта'''
+        url_builder.build('post_detail', post_id=1)
+        set_script_prefix('/yatube/')
+        self.addCleanup(set_script_prefix, '/')
+        self.assertEqual(
+            url_builder.build('post_detail', post_id=1), '/yatube/posts/1/'
+        )
+
+    def test_feed_links(self):
+        '''Ссылки поста в ленте строятся без reverse'''
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        response = self.client.get(INDEX_URL)
+        self.assertEqual(response.context['page_obj'][0].urls, {
+            'profile': reverse('posts:profile', args=('author',)),
+            'post_detail': reverse('posts:post_detail', args=(post.pk,)),
+            'group_posts': reverse('posts:group_posts', args=('group',)),
+        })
+        for url in response.context['page_obj'][0].urls.values():
+            self.assertContains(response, f'href="{url}"')
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -6,8 +7,11 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django import forms
 
+from posts import fragments
 from posts.models import Comment, Follow, Group, Post, User
 from posts.forms import PostForm
 from posts.tests.constants import (INDEX_URL, GROUP_POSTS_URL,
@@ -191,13 +195,147 @@ class PostPagesTests(TestCase):
         self.assertContains(response, 'Тестовый комментарий')
 
     def test_check_cache_for_index_page(self):
-        '''Проверяем кэш для главной страницы'''
+        '''Проверяем кэш для главной страницы: страница отдаётся из кэша,
+        пока сигнал не сбросит его при удалении поста'''
         response = self.guest_client.get(INDEX_URL)
         first_view = response.content
-        Post.objects.get(id=1).delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
         response2 = self.guest_client.get(INDEX_URL)
-        second_view = response2.content
-        self.assertEqual(first_view, second_view)
+        self.assertIsNone(response2.context)
+        self.assertEqual(first_view, response2.content)
+        Post.objects.get(pk=self.post.pk).delete()
+        response3 = self.guest_client.get(INDEX_URL)
+        self.assertNotEqual(first_view, response3.content)
+
+    def test_cache_for_post_detail_reset_by_comment(self):
+        '''Новый комментарий сбрасывает кэш страницы поста'''
+        self.guest_client.get(self.POST_DETAIL_URL)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Свежий комментарий'
+        )
+        response = self.guest_client.get(self.POST_DETAIL_URL)
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_comments_shown_when_counter_drifts(self):
+        '''Комментарии выводятся, даже если счётчик поста отстал'''
+        Comment.objects.bulk_create([Comment(
+            post=self.post, author=self.user, text='Без счётчика'
+        )])
+        Post.objects.filter(pk=self.post.pk).update(comments_count=0)
+        response = self.authorized_client.get(self.POST_DETAIL_URL)
+        self.assertContains(response, 'Без счётчика')
+
+    def test_cache_not_used_for_authorized_user(self):
+        '''Страницы авторизованного пользователя не берутся из кэша'''
+        self.authorized_client.get(INDEX_URL)
+        response = self.authorized_client.get(INDEX_URL)
+        self.assertIsNotNone(response.context)
+
+    def test_post_fragment_shared_by_feeds(self):
+        '''HTML поста рендерится один раз и берётся из кэша всеми
+        лентами, пока пост не отредактирован'''
+        self.authorized_client.get(INDEX_URL)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIsNotNone(cache.get(fragments.fragment_key(post)))
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
+        for url in (INDEX_URL, GROUP_POSTS_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Тестовый пост')
+                self.assertNotContains(response, 'Без сигнала')
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            {'text': 'Отредактированный пост', 'group': self.group.pk},
+        )
+        response = self.authorized_client.get(INDEX_URL)
+        self.assertContains(response, 'Отредактированный пост')
+
+    def test_post_fragment_follows_author(self):
+        '''Смена логина или имени автора даёт новый фрагмент поста'''
+        self.authorized_client.get(INDEX_URL)
+        User.objects.filter(pk=self.user.pk).update(
+            username='renamed', first_name='Новое', last_name='Имя'
+        )
+        response = self.authorized_client.get(INDEX_URL)
+        self.assertContains(response, 'Новое Имя')
+        self.assertContains(
+            response, reverse('posts:profile', args=['renamed'])
+        )
+
+    def test_not_modified_by_etag(self):
+        '''Неизменённая страница отдаётся ответом 304 по ETag'''
+        for url in (*self.templates, self.POST_DETAIL_URL):
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertIsNone(response.context)
+
+    def test_etag_changes_with_content(self):
+        '''Новый пост или комментарий меняет ETag'''
+        etag = self.guest_client.get(self.POST_DETAIL_URL)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Ещё комментарий'
+        )
+        response = self.guest_client.get(
+            self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = self.guest_client.get(INDEX_URL)['ETag']
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.guest_client.get(INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_since(self):
+        '''Анонимам отдаётся Last-Modified, по нему тоже отвечаем 304'''
+        last_modified = self.guest_client.get(INDEX_URL)['Last-Modified']
+        response = self.guest_client.get(
+            INDEX_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.guest_client.get(
+            INDEX_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        '''ETag страницы у анонима и у пользователя разный'''
+        etag = self.guest_client.get(INDEX_URL)['ETag']
+        response = self.authorized_client.get(
+            INDEX_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_etag_changes_after_login(self):
+        '''Вход меняет токен CSRF: страница с формой комментария под
+        старым ETag не отдаётся ответом 304, и комментарий сохраняется'''
+        User.objects.create_user('reader', password='secret')
+        client = Client(enforce_csrf_checks=True)
+
+        def login():
+            client.get('/auth/login/')
+            client.post('/auth/login/', {
+                'username': 'reader', 'password': 'secret',
+                'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+            })
+
+        login()
+        etag = client.get(self.POST_DETAIL_URL)['ETag']
+        client.get('/auth/logout/')
+        login()
+        response = client.get(self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        client.post(reverse('posts:add_comment', args=(self.post.pk,)), {
+            'text': 'Комментарий после входа',
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        })
+        self.assertTrue(Comment.objects.filter(
+            text='Комментарий после входа'
+        ).exists())
 
     def test_following(self):
         '''Проверяем возможность подписаться/отписаться на автора
@@ -237,9 +375,12 @@ class PostPagesTests(TestCase):
     def test_image_in_page(self):
         '''При отправке поста с картинкой через форму PostForm
         создаётся запись в базе данных.'''
+        digest = hashlib.sha256(self.small_gif).hexdigest()
         self.assertTrue(
-            Post.objects.filter(text='Тестовый пост',
-                                image='posts/small.gif').exists()
+            Post.objects.filter(
+                text='Тестовый пост',
+                image=f'posts/{digest[:2]}/{digest}.gif'
+            ).exists()
         )
 
 
@@ -267,6 +408,9 @@ class PaginatorViewsTest(TestCase):
             INDEX_URL: 'posts/index.html'
         }
 
+    def setUp(self):
+        cache.clear()
+
     def test_index_contains_ten_posts(self):
         '''Проверяем, что страница индекс показывает
         только 10 постов на странице'''
@@ -274,3 +418,77 @@ class PaginatorViewsTest(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.client.get(reverse_name)
                 self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_second_page_by_cursor(self):
+        '''Проверяем, что вторая страница открывается по курсору
+        и содержит оставшиеся посты'''
+        response = self.client.get(INDEX_URL)
+        cursor = response.context['page_obj'].next_cursor
+        self.assertIsNotNone(cursor)
+        response = self.client.get(INDEX_URL, {'after': cursor})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 4)
+        self.assertIsNone(page_obj.next_cursor)
+        first_page = list(Post.objects.order_by('-pub_date', '-pk')[:10])
+        response = self.client.get(
+            INDEX_URL, {'before': page_obj.previous_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), first_page)
+
+    def test_paginator_does_not_count_posts(self):
+        '''Проверяем, что паджинатор не выполняет COUNT и OFFSET'''
+        response = self.client.get(INDEX_URL)
+        cursor = response.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(INDEX_URL, {'after': cursor})
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='unknown')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group
+        )
+        cls.follower = User.objects.create(username='follower')
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+        cache.clear()
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        return len(queries)
+
+    def test_feed_queries_do_not_depend_on_posts(self):
+        '''Проверяем, что число запросов на страницу ленты
+        не зависит от числа постов, авторов и групп'''
+        urls = (INDEX_URL, GROUP_POSTS_URL, PROFILE_URL, FOLLOW_INDEX_URL)
+        expected = {url: self.count_queries(url) for url in urls}
+        for i in range(15):
+            author = User.objects.create(username=f'author{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-'
+            )
+            Follow.objects.create(user=self.follower, author=author)
+            Post.objects.create(author=author, text='Пост', group=group)
+            Post.objects.create(author=self.user, text='Пост',
+                                group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), expected[url])
@@ -0,0 +1,93 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import perf
+
+from . import images, page_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _save(queryset, **fields):
+    '''Сохраняет поля миниатюры в обход сигналов, поэтому сам сбрасывает
+    кэш лент и страницы поста: иначе страницы из кэша и ответы 304
+    показывают прежнюю картинку. Время изменения сбрасывает кэш
+    фрагментов поста.'''
+    post_ids = list(queryset.values_list('pk', flat=True))
+    if not queryset.update(updated=timezone.now(), **fields):
+        return
+    page_cache.bump_generation()
+    for post_id in post_ids:
+        page_cache.bump_generation(page_cache.post_generation(post_id))
+
+
+def generate(post_id, image_name, rebuild=False):
+    '''Строит варианты картинки поста и сохраняет в посте адрес
+    JPEG-миниатюры и список построенных современных форматов.
+
+    Одинаковые картинки хранятся одним файлом, поэтому уже построенные
+    для него варианты используются повторно.
+    '''
+    post = Post.objects.only('image').filter(
+        pk=post_id, image=image_name
+    ).first()
+    # картинку успели заменить или удалить
+    if post is None or not post.image.storage.exists(image_name):
+        return None
+    formats = None if rebuild else images.existing_formats(image_name)
+    if formats != images.modern_formats():
+        with perf.timer('thumbnail'):
+            formats = images.build_variants(post.image)
+    url = images.fallback_url(image_name)
+    _save(
+        Post.objects.filter(pk=post_id, image=image_name),
+        thumbnail_url=url, image_formats=' '.join(formats),
+    )
+    return url
+
+
+def _generate_in_worker(post_id, image_name):
+    try:
+        generate(post_id, image_name)
+    except Exception:
+        logger.exception('Не удалось построить картинки поста %s', post_id)
+    finally:
+        connection.close()
+
+
+def schedule(post):
+    '''Ставит построение вариантов картинки в пул фоновых потоков
+    после фиксации транзакции. Без пула или если варианты этой картинки
+    уже есть, обновляет пост сразу.'''
+    name = post.image.name
+    if not name:
+        _save(
+            Post.objects.filter(pk=post.pk), thumbnail_url='', image_formats=''
+        )
+    elif (not settings.POSTS_THUMBNAIL_WORKERS
+          or images.existing_formats(name) == images.modern_formats()):
+        generate(post.pk, name)
+    else:
+        _save(
+            Post.objects.filter(pk=post.pk), thumbnail_url='', image_formats=''
+        )
+        transaction.on_commit(lambda: _get_executor().submit(
+            _generate_in_worker, post.pk, name
+        ))
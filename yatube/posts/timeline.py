@@ -0,0 +1,70 @@
+from itertools import islice
+
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry
+from .utils import get_feed
+
+BATCH_SIZE = 1000
+
+
+def _insert(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, BATCH_SIZE))
+
+
+def fan_out(post):
+    '''Раскладывает новый пост в ленты всех подписчиков автора.'''
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def add_author(user_id, author_id):
+    '''Добавляет посты автора в ленту нового подписчика.'''
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def remove_author(user_id, author_id):
+    '''Убирает посты автора из ленты бывшего подписчика.'''
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def fill_all():
+    '''Раскладывает все посты по лентам подписчиков одним запросом,
+    пропуская уже разложенные. Возвращает число добавленных записей.'''
+    entry, follow, post = (
+        model._meta.db_table for model in (TimelineEntry, Follow, Post)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {entry} (user_id, post_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.pub_date FROM {follow} f '
+            f'JOIN {post} p ON p.author_id = f.author_id '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {entry} e '
+            'WHERE e.user_id = f.user_id AND e.post_id = p.id)'
+        )
+        return cursor.rowcount
+
+
+def get_timeline(user):
+    return get_feed(
+        TimelineEntry.objects.filter(user=user),
+        prefix='post__',
+        extra=('pub_date', 'post'),
+    )
@@ -0,0 +1,55 @@
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+NAMESPACE = 'posts'
+# число подходит под конвертеры int, slug и str и не встречается в адресах
+MARKER = 918273645000
+SAFE = RFC3986_SUBDELIMS + '/~:@'
+
+
+@lru_cache(maxsize=None)
+def url_format(name, urlconf=None, prefix=None):
+    '''Строка формата адреса posts:<name> с полями по аргументам пути.
+
+    reverse вызывается один раз с числовыми метками вместо аргументов,
+    метки заменяются на поля формата. urlconf и префикс скрипта входят
+    в ключ кэша: от них зависит результат reverse.
+    '''
+    # posts.urls импортирует views, а они - этот модуль
+    from .urls import urlpatterns
+
+    pattern = next(item for item in urlpatterns if item.name == name)
+    markers = {
+        key: str(MARKER + number)
+        for number, key in enumerate(pattern.pattern.converters)
+    }
+    path = reverse(f'{NAMESPACE}:{name}', urlconf=urlconf, kwargs=markers)
+    path = path.replace('{', '{{').replace('}', '}}')
+    for key, marker in markers.items():
+        path = path.replace(marker, f'{{{key}}}')
+    return path
+
+
+def build(name, **kwargs):
+    '''Адрес posts:<name> без обхода резолвера. В отличие от reverse
+    значения не проверяются по конвертерам пути, только экранируются.'''
+    return url_format(name, get_urlconf(), get_script_prefix()).format(**{
+        key: quote(str(value), safe=SAFE) for key, value in kwargs.items()
+    })
+
+
+def attach(posts):
+    '''Кладёт в post.urls адреса автора, поста и группы для шаблонов.'''
+    for post in posts:
+        post.urls = {
+            'profile': build('profile', username=post.author.username),
+            'post_detail': build('post_detail', post_id=post.pk),
+            'group_posts': (
+                build('group_posts', slug=post.group.slug)
+                if post.group_id else ''
+            ),
+        }
+    return posts
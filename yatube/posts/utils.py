@@ -1,9 +1,122 @@
-from django.core.paginator import Paginator
+from datetime import datetime, timedelta, timezone
 
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
 
-def get_pagination_context(queryset, request):
-    posts_per_page = 10
-    paginator = Paginator(queryset, posts_per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+POSTS_PER_PAGE = 10
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# поля, которые читает includes/single_post.html
+FEED_FIELDS = (
+    'text', 'pub_date', 'updated', 'image', 'thumbnail_url', 'image_formats',
+    'comments_count',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__slug', 'group__title',
+)
+
+
+def get_feed(queryset, prefix='', extra=()):
+    '''Готовит queryset ленты постов: связанные автор и группа
+    выбираются одним запросом, загружаются только нужные поля.'''
+    return queryset.select_related(
+        f'{prefix}author', f'{prefix}group'
+    ).only(*extra, *(prefix + field for field in FEED_FIELDS))
+
+
+def parse_int(value, default, minimum=1, maximum=None):
+    '''Целое из параметра запроса в пределах [minimum, maximum].
+
+    Строки вроде «²» проходят str.isdigit, но не int, поэтому значение
+    разбирается через int с перехватом ошибки.
+    '''
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    if number < minimum:
+        return default
+    return number if maximum is None else min(number, maximum)
+
+
+def encode_cursor(pub_date, pk):
+    micros = (pub_date - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}_{pk}'
+
+
+def decode_cursor(cursor):
+    try:
+        micros, pk = cursor.split('_')
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class CursorPaginator(Paginator):
+    '''Постраничный вывод по ключу (pub_date, id).
+
+    Соседние страницы выбираются диапазоном по индексу от курсора,
+    без COUNT(*) и OFFSET, поэтому глубокие страницы стоят столько же,
+    сколько первая.
+    '''
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'pk')):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+
+    def _check_object_list_is_ordered(self):
+        # порядок задаётся ключами курсора в page_queryset
+        pass
+
+    def _seek(self, values, lookup):
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            exact = dict(zip(self.keys[:i], values[:i]))
+            condition |= Q(**{f'{key}__{lookup}': values[i]}, **exact)
+        # нестрогое условие по первому ключу даёт поиск диапазона по индексу
+        bound = Q(**{f'{self.keys[0]}__{lookup}e': values[0]})
+        return bound & condition
+
+    def _cursor(self, obj):
+        return encode_cursor(*(getattr(obj, key) for key in self.keys))
+
+    def page_queryset(self, values=None, descending=True):
+        order = [f'-{key}' if descending else key for key in self.keys]
+        queryset = self.object_list.order_by(*order)
+        if values is not None:
+            queryset = queryset.filter(
+                self._seek(values, 'lt' if descending else 'gt')
+            )
+        return queryset[:self.per_page + 1]
+
+    def _fetch(self, values, descending):
+        return list(self.page_queryset(values, descending))
+
+    def get_page(self, after=None, before=None):
+        after, before = decode_cursor(after), decode_cursor(before)
+        rows = []
+        if before is not None:
+            rows = self._fetch(before, descending=False)
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        if not rows:
+            rows = self._fetch(after, descending=True)
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = after is not None
+        page = Page(rows, None, self)
+        page.previous_cursor = (
+            self._cursor(rows[0]) if has_previous and rows else None
+        )
+        page.next_cursor = (
+            self._cursor(rows[-1]) if has_next and rows else None
+        )
+        return page
+
+
+def get_pagination_context(queryset, request, keys=('pub_date', 'pk')):
+    paginator = CursorPaginator(queryset, POSTS_PER_PAGE, keys)
+    page_obj = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
     return page_obj
@@ -1,24 +1,42 @@
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 
+from core.routers import pin_to_primary, read_from_replica
+
+from . import fragments
+from .autocomplete import DEFAULT_LIMIT, MAX_LIMIT, suggest
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import get_pagination_context
+from .page_cache import cache_anonymous_page, conditional_page
+from .search import MAX_SEARCH_PAGE, search_ids
+from .timeline import get_timeline
+from .utils import (
+    POSTS_PER_PAGE, get_feed, get_pagination_context, parse_int,
+)
 
 
+@read_from_replica
+@conditional_page
+@cache_anonymous_page
 def index(request):
-    posts = Post.objects.select_related('author').all()
+    posts = get_feed(Post.objects.all())
     page_obj = get_pagination_context(posts, request)
+    fragments.attach(page_obj)
     context = {
         'page_obj': page_obj
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@conditional_page
+@cache_anonymous_page
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group').all()
+    posts = get_feed(group.posts.all())
     page_obj = get_pagination_context(posts, request)
+    fragments.attach(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj
@@ -26,11 +44,17 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@conditional_page
+@cache_anonymous_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = get_feed(author.posts.all())
     following = Follow.objects.filter().exists()
     page_obj = get_pagination_context(posts, request)
+    fragments.attach(page_obj)
     context = {
         'author': author,
         'following': following,
@@ -39,17 +63,51 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@read_from_replica
+@conditional_page
+@cache_anonymous_page
 def post_detail(request, post_id):
     form = CommentForm(request.POST or None)
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     context = {
         'post': post,
+        'comments': post.comments.select_related('author'),
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = parse_int(request.GET.get('page'), 1, maximum=MAX_SEARCH_PAGE)
+    ids = search_ids(
+        query, POSTS_PER_PAGE + 1, (page - 1) * POSTS_PER_PAGE
+    )
+    found = get_feed(Post.objects.all()).in_bulk(ids[:POSTS_PER_PAGE])
+    context = {
+        'query': query,
+        'posts': fragments.attach(
+            found[pk] for pk in ids[:POSTS_PER_PAGE] if pk in found
+        ),
+        'page': page,
+        'has_next': len(ids) > POSTS_PER_PAGE,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def autocomplete(request):
+    limit = parse_int(
+        request.GET.get('limit'), DEFAULT_LIMIT, maximum=MAX_LIMIT
+    )
+    return JsonResponse(
+        {'results': suggest(request.GET.get('q', ''), limit)}
+    )
+
+
 @login_required
+@pin_to_primary
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -64,6 +122,7 @@ def post_create(request):
 
 
 @login_required
+@pin_to_primary
 def post_edit(request, post_id):
     is_edit = True
     post = get_object_or_404(Post, pk=post_id)
@@ -85,6 +144,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@pin_to_primary
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -97,10 +157,16 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_from_replica
 def follow_index(request):
-    # информация о текущем пользователе доступна в переменной request.user
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_pagination_context(posts, request)
+    # лента заранее разложена по подписчикам при публикации поста
+    entries = get_timeline(request.user)
+    page_obj = get_pagination_context(
+        entries, request, keys=('pub_date', 'post_id')
+    )
+    page_obj.object_list = fragments.attach(
+        entry.post for entry in page_obj
+    )
     context = {
         'page_obj': page_obj
     }
@@ -108,6 +174,7 @@ def follow_index(request):
 
 
 @login_required
+@pin_to_primary
 def profile_follow(request, username):
     if request.user.username != username:
         Follow.objects.get_or_create(
@@ -118,6 +185,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@pin_to_primary
 def profile_unfollow(request, username):
     Follow.objects.get(
         user=request.user, author=get_object_or_404(User, username=username)
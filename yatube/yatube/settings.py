@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -44,17 +48,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'core',
+    'core.apps.CoreConfig',
     'about',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,12 +68,22 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# шаблоны разбираются один раз за жизнь процесса и компилируются при
+# старте воркера (yatube/wsgi.py); правки шаблонов видны после перезапуска
+TEMPLATES_CACHED = not DEBUG
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATES_CACHED else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -91,9 +107,43 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # соединение переживает запрос и переиспользуется процессом
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# настройки, которые core.signals применяет к каждому соединению SQLite:
+# WAL позволяет читать во время записи, а busy_timeout заставляет
+# ждать блокировку вместо ошибки database is locked
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# реплики только для чтения - копии основной базы, которые обновляет
+# команда sync_replicas, запущенная с --interval меньше
+# DATABASE_REPLICA_LAG, например
+# DATABASE_REPLICA_FILES = [os.path.join(BASE_DIR, 'replica1.sqlite3')]
+DATABASE_REPLICA_FILES = []
+DATABASE_REPLICAS = []
+for number, name in enumerate(DATABASE_REPLICA_FILES, 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# допустимое отставание реплик в секундах. Оно измеряется по времени
+# последнего sync_replicas: более старые реплики не читаются. Столько же
+# хранятся страницы, собранные по данным реплики
+DATABASE_REPLICA_LAG = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -145,8 +195,72 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# общий для всех процессов кэш в файле SQLite; через него идут фрагменты
+# шаблонов, сессии, хранилище миниатюр sorl и кэш страниц лент.
+# Для кэша в памяти одного процесса можно указать
+# django.core.cache.backends.locmem.LocMemCache
+# тесты (manage.py test и pytest) не делят файл кэша с рабочим сервером
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+CACHE_DIR = BASE_DIR
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, True)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+THUMBNAIL_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+THUMBNAIL_CACHE = 'default'
+
+# миниатюры постов строятся в фоновых потоках при сохранении картинки;
+# 0 - строить сразу в потоке запроса
+POSTS_THUMBNAIL_WORKERS = 2
+
+# страницы для анонимов сбрасываются сигналами, срок хранения большой
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# HTML постов в лентах хранится по ключу от времени изменения поста
+# и данных автора
+POSTS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# индекс подсказок живёт в памяти процесса и перестраивается с этим
+# периодом, чтобы подхватить изменения из других процессов
+POSTS_AUTOCOMPLETE_TTL = 60 * 5
+
+# заголовок Server-Timing с разбивкой времени запроса для инструментов
+# разработчика браузера
+PERF_SERVER_TIMING = True
+
+# файлы метрик процессов сервера, /metrics складывает их все;
+# при развёртывании каталог нужно очищать, иначе счётчики продолжатся
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'yatube-metrics')
+
+# запрос одной формы, повторённый столько раз за ответ, считается N+1;
+# в разработке такие места пишутся в лог
+NPLUSONE_THRESHOLD = 5
+if DEBUG:
+    MIDDLEWARE.append('core.middleware.NPlusOneMiddleware')
+# сколько запросов к базе допускают тесты на страницу, см. tests/conftest.py
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    'posts:group_posts': 4,
+    'posts:profile': 5,
+    'posts:post_detail': 4,
+    'posts:follow_index': 3,
+    'posts:search': 4,
+}
+DEFAULT_QUERY_BUDGET = 10
+
+# профилировщик запросов для сотрудников: куда писать профили,
+# период снятия стека в секундах и срок действия ключа
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILER_INTERVAL = 0.005
+PROFILER_TOKEN_MAX_AGE = 60 * 60
@@ -20,8 +20,12 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics_view, perf_report
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('perf/', perf_report, name='perf_report'),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('posts.urls', namespace='index')),
     path('auth/', include('users.urls', namespace='user')),
     path('auth/', include('django.contrib.auth.urls')),